@@ -1,3 +1,4 @@
 from .pubkey import *
 from .prime import *
+from .arith import *
 from .system import *
\ No newline at end of file
@@ -0,0 +1,9 @@
+from .fixed_base import FixedBaseTable
+from .precompute import PrecomputePool
+from .multiexp import multi_pow
+
+__all__ = [
+    'FixedBaseTable',
+    'PrecomputePool',
+    'multi_pow',
+]
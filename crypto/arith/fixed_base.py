@@ -0,0 +1,82 @@
+import unittest
+
+import gmpy2
+from gmpy2 import mpz
+
+DEFAULT_MEMORY_BUDGET = 4 << 20   # 4 MiB cho mỗi bảng
+MAX_WINDOW = 12
+
+
+class FixedBaseTable:
+    """
+    Bảng lũy thừa cơ số cố định (cửa sổ cố định kiểu comb / Lim–Lee một chiều):
+        rows[i][d - 1] = base^(d · 2^(w·i)) mod modulus,  1 <= d < 2^w
+    Khi đó base^e = Π rows[i][d_i] với d_i là cửa sổ w bit thứ i của e:
+    chỉ cần ~exponent_bits / w phép nhân, không còn phép bình phương nào.
+    w được chọn lớn nhất sao cho bảng vừa memory_budget (byte).
+    """
+
+    def __init__(self, base: int, modulus: int, exponent_bits: int,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET, window: int | None = None):
+        self.base = mpz(base)
+        self.modulus = mpz(modulus)
+        self.exponent_bits = exponent_bits
+        self.window = window or self._choose_window(exponent_bits, (self.modulus.bit_length() + 7) // 8, memory_budget)
+
+        w, p = self.window, self.modulus
+        self._mask = (1 << w) - 1
+        self.rows: list[list[mpz]] = []
+        b = self.base % p
+        for _ in range(-(-exponent_bits // w)):
+            row = [b]
+            for _ in range((1 << w) - 2):
+                row.append(row[-1] * b % p)
+            self.rows.append(row)
+            b = row[-1] * b % p            # base^(2^w) của hàng kế tiếp
+
+    @staticmethod
+    def _choose_window(exponent_bits: int, entry_bytes: int, memory_budget: int) -> int:
+        best = 1
+        for w in range(1, MAX_WINDOW + 1):
+            size = -(-exponent_bits // w) * ((1 << w) - 1) * entry_bytes
+            if size > memory_budget:
+                break
+            best = w
+        return best
+
+    @property
+    def memory_bytes(self) -> int:
+        entry_bytes = (self.modulus.bit_length() + 7) // 8
+        return len(self.rows) * ((1 << self.window) - 1) * entry_bytes
+
+    def pow(self, e: int) -> mpz:
+        """base^e mod modulus; số mũ âm hoặc dài hơn bảng thì dùng powmod thường."""
+        if e < 0 or e.bit_length() > self.exponent_bits:
+            return gmpy2.powmod(self.base, e, self.modulus)
+        e = mpz(e)
+        p, w, mask = self.modulus, self.window, self._mask
+        acc = mpz(1)
+        for row in self.rows:
+            if not e:
+                break
+            d = e & mask
+            if d:
+                acc = acc * row[d - 1] % p
+            e >>= w
+        return acc
+
+    def __repr__(self) -> str:
+        return f"FixedBaseTable(window={self.window}, rows={len(self.rows)}, memory={self.memory_bytes} bytes)"
+
+
+class FixedBaseTableTest(unittest.TestCase):
+    def test_pow(self):
+        p = gmpy2.next_prime(mpz(2) ** 521)
+        for budget in (1 << 12, 1 << 16, 1 << 20):
+            table = FixedBaseTable(3, p, 530, memory_budget=budget)
+            for e in (0, 1, 2, 12345, p - 2, (1 << 530) - 1, 1 << 531, -5):
+                self.assertEqual(table.pow(e), gmpy2.powmod(3, e, p))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import time
+import unittest
+
+import gmpy2
+from gmpy2 import mpz
+
+MAX_WINDOW = 8
+
+
+def _choose_window(exponent_bits: int) -> int:
+    """w nhỏ nhất hóa chi phí mỗi cơ số: 2^(w-1) phép nhân dựng bảng + ~bits/(w+1) phép nhân khi quét."""
+    return min(range(1, MAX_WINDOW + 1), key=lambda w: (1 << (w - 1)) + exponent_bits / (w + 1))
+
+
+def multi_pow(bases, exponents, modulus: int, window: int | None = None) -> mpz:
+    """
+    Π bases[i]^exponents[i] mod modulus bằng cửa sổ trượt đan xen (Straus / mẹo Shamir tổng quát):
+    - mỗi cơ số có bảng lũy thừa lẻ b, b^3, ..., b^(2^w - 1)
+    - số mũ được cắt thành các cửa sổ lẻ; mọi cơ số dùng chung một chuỗi bình phương
+    Chi phí ~max(bits) phép bình phương + Σ bits_i / (w+1) phép nhân, thay vì Σ bits_i bình phương khi gọi pow riêng.
+    Số mũ âm dùng nghịch đảo của cơ số (ZeroDivisionError nếu không khả nghịch).
+    """
+    p = mpz(modulus)
+    pairs = []
+    for b, e in zip(bases, exponents):
+        b, e = mpz(b) % p, mpz(e)
+        if e < 0:
+            b, e = gmpy2.invert(b, p), -e
+        if e:
+            pairs.append((b, e))
+    if not pairs:
+        return mpz(1) % p
+    if len(pairs) == 1:
+        return gmpy2.powmod(pairs[0][0], pairs[0][1], p)
+
+    nbits = max(e.bit_length() for _, e in pairs)
+    w = window or _choose_window(nbits)
+    # schedule[j]: các phần tử bảng cần nhân vào sau bình phương ở bit j
+    schedule = [[] for _ in range(nbits)]
+    for b, e in pairs:
+        b2 = b * b % p
+        table = [b]
+        for _ in range((1 << (w - 1)) - 1):
+            table.append(table[-1] * b2 % p)
+        i = e.bit_length() - 1
+        while i >= 0:
+            if not e.bit_test(i):
+                i -= 1
+                continue
+            j = max(i - w + 1, 0)
+            while not e.bit_test(j):
+                j += 1
+            d = (e >> j) & ((1 << (i - j + 1)) - 1)
+            schedule[j].append(table[d >> 1])
+            i = j - 1
+
+    acc = mpz(1)
+    for j in range(nbits - 1, -1, -1):
+        acc = acc * acc % p
+        for x in schedule[j]:
+            acc = acc * x % p
+    return acc
+
+
+class MultiExpTest(unittest.TestCase):
+    def naive(self, bases, exponents, p):
+        acc = mpz(1)
+        for b, e in zip(bases, exponents):
+            acc = acc * gmpy2.powmod(b, e, p) % p
+        return acc
+
+    def test_matches_pow(self):
+        p = gmpy2.next_prime(mpz(2) ** 521)
+        state = gmpy2.random_state(7)
+        for k in (1, 2, 3, 10):
+            bases = [gmpy2.mpz_urandomb(state, 530) for _ in range(k)]
+            for bits in (1, 5, 64, 521):
+                exponents = [gmpy2.mpz_urandomb(state, bits) for _ in range(k)]
+                for window in (None, 1, 4):
+                    self.assertEqual(multi_pow(bases, exponents, p, window), self.naive(bases, exponents, p))
+
+    def test_edge_cases(self):
+        p = mpz(1000003)
+        self.assertEqual(multi_pow([], [], p), 1)
+        self.assertEqual(multi_pow([5, 7], [0, 0], p), 1)
+        self.assertEqual(multi_pow([5, 7, 0], [3, -2, 4], p), 0)
+        self.assertEqual(multi_pow([5, 7], [3, -2], p), gmpy2.powmod(5, 3, p) * gmpy2.powmod(7, -2, p) % p)
+        self.assertEqual(multi_pow([5, 5], [1 << 40, 1], p), gmpy2.powmod(5, (1 << 40) + 1, p))
+
+
+if __name__ == "__main__":
+    # So sánh multi_pow với k lần powmod riêng rồi nhân lại (chạy test: python -m unittest crypto.arith.multiexp)
+    state = gmpy2.random_state(int(time.time()))
+    rounds = 20
+    for bits in (1024, 2048, 3072):
+        p = gmpy2.next_prime(gmpy2.mpz_urandomb(state, bits) | (mpz(1) << (bits - 1)))
+        for exp_bits in (256, bits):
+            for k in (2, 3, 5, 10):
+                bases = [gmpy2.mpz_urandomb(state, bits) % p for _ in range(k)]
+                exponents = [gmpy2.mpz_urandomb(state, exp_bits) for _ in range(k)]
+                t0 = time.perf_counter()
+                for _ in range(rounds):
+                    fast = multi_pow(bases, exponents, p)
+                t1 = time.perf_counter()
+                for _ in range(rounds):
+                    acc = mpz(1)
+                    for b, e in zip(bases, exponents):
+                        acc = acc * gmpy2.powmod(b, e, p) % p
+                t2 = time.perf_counter()
+                assert fast == acc
+                print(f"{bits}-bit p, {exp_bits}-bit mũ, k={k}: multi_pow {(t1 - t0) / rounds * 1000:.2f} ms, "
+                      f"powmod riêng {(t2 - t1) / rounds * 1000:.2f} ms ({(t2 - t1) / (t1 - t0):.2f}x)")
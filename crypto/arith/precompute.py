@@ -0,0 +1,194 @@
+import threading
+import time
+import unittest
+from collections import deque
+
+from typing import Any, Callable, Optional
+
+DEFAULT_CAPACITY = 256
+DEFAULT_LOW_WATERMARK = 64
+
+
+class PrecomputePoolStats:
+    """Bộ đếm của PrecomputePool."""
+
+    def __init__(self):
+        self.hits = 0              # lấy được phần tử tính sẵn
+        self.misses = 0            # pool rỗng, người gọi tự tính
+        self.generated = 0         # số phần tử luồng nền đã tính
+        self.refill_seconds = 0.0  # tổng thời gian tính của luồng nền
+
+    def as_dict(self) -> dict:
+        taken = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "refill_seconds": self.refill_seconds,
+            "hit_rate": self.hits / taken if taken else 0.0,
+            "refill_rate": self.generated / self.refill_seconds if self.refill_seconds else 0.0,
+        }
+
+
+class PrecomputePool:
+    """
+    Hàng đợi có giới hạn các giá trị không phụ thuộc thông điệp (vd. (g^k, beta^k)),
+    được luồng nền tính trước bằng 'produce()'.
+    - Khi số phần tử còn lại <= low_watermark, luồng nền tính thêm đến khi đầy capacity.
+    - take() lấy một phần tử trong O(1) hoặc trả về None khi pool rỗng (người gọi tự tính);
+      mỗi phần tử chỉ được phát ra một lần.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[], Any],
+        capacity: int = DEFAULT_CAPACITY,
+        low_watermark: int = DEFAULT_LOW_WATERMARK,
+        start: bool = True,
+        name: str = "precompute-pool",
+    ):
+        if low_watermark >= capacity:
+            raise ValueError("low_watermark phải nhỏ hơn capacity")
+        self.produce = produce
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.name = name
+
+        self._items: deque = deque()
+        self._stats = PrecomputePoolStats()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self.start()
+
+    def take(self) -> Any:
+        """Lấy một phần tử tính sẵn, hoặc None nếu pool đang rỗng."""
+        with self._cond:
+            if not self._items:
+                self._stats.misses += 1
+                self._cond.notify()
+                return None
+            item = self._items.popleft()
+            self._stats.hits += 1
+            if len(self._items) <= self.low_watermark:
+                self._cond.notify()
+            return item
+
+    def level(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"level": len(self._items), "capacity": self.capacity, **self._stats.as_dict()}
+
+    def fill(self) -> None:
+        """
+        Tính đồng bộ đến khi đầy capacity (dùng khi không chạy luồng nền);
+        trả về ngay nếu pool đã close(). Điều kiện dừng được kiểm tra dưới khóa,
+        phần tử tính thừa khi chạy song song với luồng nền sẽ bị bỏ.
+        """
+        while True:
+            with self._cond:
+                if self._closed or len(self._items) >= self.capacity:
+                    return
+            self._refill_one()
+
+    # === Luồng nền ===
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._closed = False
+            self._thread = threading.Thread(target=self._refill_loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Dừng luồng nền (sau khi phần tử đang tính hoàn tất) và bỏ các phần tử còn lại."""
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "PrecomputePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _refill_loop(self) -> None:
+        # Lần đầu lấp đầy đến capacity; sau đó chỉ refill khi chạm low_watermark
+        filling = True
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    if len(self._items) <= self.low_watermark:
+                        filling = True
+                    if filling and len(self._items) < self.capacity:
+                        break
+                    filling = False
+                    self._cond.wait()
+            self._refill_one()
+
+    def _refill_one(self) -> None:
+        t0 = time.perf_counter()
+        item = self.produce()
+        elapsed = time.perf_counter() - t0
+        with self._cond:
+            if self._closed or len(self._items) >= self.capacity:
+                return
+            self._items.append(item)
+            self._stats.generated += 1
+            self._stats.refill_seconds += elapsed
+
+
+class PrecomputePoolTest(unittest.TestCase):
+    def test_take_each_item_once(self):
+        counter = iter(range(10 ** 6))
+        pool = PrecomputePool(lambda: next(counter), capacity=8, low_watermark=2, start=False)
+        self.assertIsNone(pool.take())
+        pool.fill()
+        self.assertEqual([pool.take() for _ in range(8)], list(range(8)))
+        self.assertIsNone(pool.take())
+        stats = pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["generated"]), (8, 2, 8))
+
+    def test_fill_after_close_and_concurrent_fill(self):
+        counter = iter(range(10 ** 6))
+        pool = PrecomputePool(lambda: next(counter), capacity=8, low_watermark=2, start=False)
+        pool.close()
+        pool.fill()
+        self.assertEqual(pool.level(), 0)
+
+        lock = threading.Lock()
+        def produce():
+            with lock:
+                return next(counter)
+        with PrecomputePool(produce, capacity=8, low_watermark=2) as pool:
+            threads = [threading.Thread(target=pool.fill) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(pool.level(), 8)
+
+    def test_background_refill(self):
+        counter = iter(range(10 ** 6))
+        with PrecomputePool(lambda: next(counter), capacity=16, low_watermark=4) as pool:
+            seen = []
+            deadline = time.time() + 5
+            while len(seen) < 100 and time.time() < deadline:
+                item = pool.take()
+                if item is not None:
+                    seen.append(item)
+            self.assertEqual(seen, sorted(set(seen)))
+            self.assertEqual(len(seen), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
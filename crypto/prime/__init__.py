@@ -1,9 +1,20 @@
-from .is_prime import is_prime
-from .generate_prime import generate_prime
-from .prime_root import find_primitive_root
+from .is_prime import is_prime, is_prime_many
+from .generate_prime import generate_prime, PrimeGenerator, get_prime_generator, FactoredPrime, generate_prime_with_factors, generate_schnorr_prime
+from .prime_root import find_primitive_root, find_subgroup_generator
+from .factorize import factorize
+from .parameter_pool import ParameterPool
 
 __all__ = [
     'is_prime',
+    'is_prime_many',
     'generate_prime',
-    'find_primitive_root'
+    'PrimeGenerator',
+    'get_prime_generator',
+    'FactoredPrime',
+    'generate_prime_with_factors',
+    'generate_schnorr_prime',
+    'find_primitive_root',
+    'find_subgroup_generator',
+    'factorize',
+    'ParameterPool',
 ]
@@ -0,0 +1,356 @@
+import secrets
+import threading
+import time
+import unittest
+from collections import OrderedDict
+
+import gmpy2
+from gmpy2 import mpz, powmod
+
+from .generate_prime import _odd_primes_below
+
+from typing import Dict, List, Optional
+
+# Tham số mặc định của các tầng phân tích
+TRIAL_BOUND = 1 << 16          # chia thử (bánh xe mod 30) tới giới hạn này
+PM1_B1 = 100_000               # Pollard p-1 stage 1
+RHO_ITERATIONS = 1 << 18       # số bước Brent rho trước khi chuyển sang ECM
+ECM_SCHEDULE = [               # (B1, số đường cong): ~15, 20, 25, 30 chữ số
+    (2_000, 25),
+    (11_000, 90),
+    (50_000, 300),
+    (250_000, 700),
+]
+CACHE_SIZE = 256
+
+_WHEEL_STEPS = [4, 2, 4, 2, 4, 6, 2, 6]   # khoảng cách giữa các số nguyên tố cùng nhau với 30, bắt đầu từ 7
+
+_primes_cache: List[int] = [2]
+
+
+def _primes_upto(bound: int) -> List[int]:
+    """Danh sách số nguyên tố <= bound (giữ lại bản lớn nhất đã sàng)."""
+    global _primes_cache
+    if _primes_cache[-1] < bound:
+        _primes_cache = [2] + _odd_primes_below(max(bound + 1, 2 * _primes_cache[-1]))
+    if _primes_cache[-1] <= bound:
+        return _primes_cache
+    lo, hi = 0, len(_primes_cache)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _primes_cache[mid] <= bound:
+            lo = mid + 1
+        else:
+            hi = mid
+    return _primes_cache[:lo]
+
+
+_flags_cache: Dict[int, bytearray] = {}
+
+
+def _prime_flags(limit: int) -> bytearray:
+    """flags[i] = 1 nếu i nguyên tố, 0 <= i < limit (dùng cho stage 2 của ECM)."""
+    if limit not in _flags_cache:
+        flags = bytearray(limit)
+        for p in _primes_upto(limit - 1):
+            flags[p] = 1
+        _flags_cache[limit] = flags
+    return _flags_cache[limit]
+
+
+def _is_probable_prime(n) -> bool:
+    return bool(gmpy2.is_prime(n))
+
+
+# === Tầng 1: chia thử theo bánh xe mod 30 ===
+
+def _wheel_trial_division(n: mpz, bound: int, out: Dict[int, int]) -> mpz:
+    """Tách mọi ước <= bound của n vào 'out', trả về phần còn lại."""
+    for p in (2, 3, 5):
+        while n % p == 0:
+            out[p] = out.get(p, 0) + 1
+            n //= p
+    d, i = 7, 0
+    while d <= bound and d * d <= n:
+        if n % d == 0:
+            while n % d == 0:
+                out[d] = out.get(d, 0) + 1
+                n //= d
+        d += _WHEEL_STEPS[i]
+        i = (i + 1) & 7
+    if 1 < n <= bound or (n > 1 and d * d > n):
+        # phần còn lại không còn ước <= sqrt → chính nó là số nguyên tố
+        out[int(n)] = out.get(int(n), 0) + 1
+        n = mpz(1)
+    return n
+
+
+# === Tầng 2: Pollard p-1 ===
+
+def _pollard_pm1(n: mpz, B1: int = PM1_B1) -> Optional[mpz]:
+    """Stage 1 của Pollard p-1: tìm ước p khi p-1 là B1-smooth."""
+    a = mpz(2)
+    batch = mpz(1)
+    for q in _primes_upto(B1):
+        qe = q
+        while qe * q <= B1:
+            qe *= q
+        batch *= qe
+        if batch.bit_length() > 4096:
+            a = powmod(a, batch, n)
+            batch = mpz(1)
+            d = gmpy2.gcd(a - 1, n)
+            if d == n:
+                return None
+            if d > 1:
+                return d
+    a = powmod(a, batch, n)
+    d = gmpy2.gcd(a - 1, n)
+    return d if 1 < d < n else None
+
+
+# === Tầng 3: Brent rho, gộp gcd theo lô ===
+
+def _brent_rho(n: mpz, max_iterations: Optional[int] = RHO_ITERATIONS, batch: int = 128) -> Optional[mpz]:
+    """
+    Biến thể Brent của Pollard rho cho x -> x^2 + c:
+    - chỉ một phép bình phương mỗi bước (không có 'y chạy gấp đôi' như Floyd)
+    - gcd được tính một lần cho tích của 'batch' hiệu |x - y|, quay lui khi gcd = n
+    Trả về None nếu vượt quá max_iterations (None → không giới hạn).
+    """
+    steps = 0
+    while True:
+        y = mpz(secrets.randbelow(n - 1) + 1)
+        c = mpz(secrets.randbelow(n - 1) + 1)
+        g, r, q = mpz(1), 1, mpz(1)
+        x = ys = y
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(batch, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gmpy2.gcd(q, n)
+                k += batch
+            steps += r
+            r <<= 1
+            if max_iterations is not None and steps > max_iterations and g == 1:
+                return None
+        if g == n:
+            # quay lui từng bước từ điểm lưu cuối cùng
+            while True:
+                ys = (ys * ys + c) % n
+                g = gmpy2.gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        if g != n:
+            return g
+
+
+# === Tầng 4: ECM trên đường cong Montgomery (Suyama) ===
+
+def _xdbl(x, z, a24, n):
+    s = (x + z) * (x + z) % n
+    d = (x - z) * (x - z) % n
+    t = s - d
+    return s * d % n, t * (d + a24 * t) % n
+
+
+def _xadd(xp, zp, xq, zq, xd, zd, n):
+    """P + Q từ P, Q và P - Q (tọa độ x:z)."""
+    u = (xp - zp) * (xq + zq)
+    v = (xp + zp) * (xq - zq)
+    s = u + v
+    t = u - v
+    return zd * s * s % n, xd * t * t % n
+
+
+def _ladder(k: int, x, z, a24, n):
+    """k·P bằng Montgomery ladder."""
+    if k == 1:
+        return x, z
+    x1, z1 = x, z
+    x2, z2 = _xdbl(x, z, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == "1":
+            x1, z1 = _xadd(x2, z2, x1, z1, x, z, n)
+            x2, z2 = _xdbl(x2, z2, a24, n)
+        else:
+            x2, z2 = _xadd(x1, z1, x2, z2, x, z, n)
+            x1, z1 = _xdbl(x1, z1, a24, n)
+    return x1, z1
+
+
+def _ecm_curve(n: mpz, B1: int, B2: int) -> Optional[mpz]:
+    """Một đường cong ECM ngẫu nhiên: stage 1 tới B1, stage 2 (baby-step giant-step) tới B2."""
+    sigma = mpz(secrets.randbelow(n - 7) + 6)
+    u = (sigma * sigma - 5) % n
+    v = 4 * sigma % n
+    x, z = powmod(u, 3, n), powmod(v, 3, n)
+    den = 16 * powmod(u, 3, n) * v % n
+    g = gmpy2.gcd(den, n)
+    if g != 1:
+        return g if g != n else None
+    a24 = powmod(v - u, 3, n) * (3 * u + v) * gmpy2.invert(den, n) % n
+
+    # Stage 1
+    for q in _primes_upto(B1):
+        qe = q
+        while qe * q <= B1:
+            qe *= q
+        x, z = _ladder(qe, x, z, a24, n)
+    g = gmpy2.gcd(z, n)
+    if g != 1:
+        return g if g != n else None
+
+    # Stage 2: mọi số nguyên tố B1 < q <= B2 viết dạng q = wD ± j, 0 < j < D/2, gcd(j, D) = 1;
+    # x(wD·P) ≡ x(j·P) (mod p) khi q·P = O trên đường cong mod p
+    D = 2310 if B1 >= 10 * 2310 else 210
+    x2, z2 = _xdbl(x, z, a24, n)
+    baby = {1: (x, z)}
+    xa, za = x, z                                  # (j-4)·P
+    xb, zb = _xadd(x2, z2, x, z, x, z, n)          # (j-2)·P, bắt đầu từ 3·P
+    baby[3] = (xb, zb)
+    for j in range(5, D // 2, 2):
+        (xa, za), (xb, zb) = (xb, zb), _xadd(xb, zb, x2, z2, xa, za, n)
+        baby[j] = (xb, zb)
+    baby = {j: pt for j, pt in baby.items() if gmpy2.gcd(j, D) == 1}
+
+    w = max(2, B1 // D)
+    xD, zD = _ladder(D, x, z, a24, n)
+    xt, zt = _ladder(w * D, x, z, a24, n)                 # w·D·P
+    xtp, ztp = _ladder((w - 1) * D, x, z, a24, n)         # (w-1)·D·P
+    flags = _prime_flags(B2 + D)
+    acc = mpz(1)
+    while w * D - D // 2 <= B2:
+        for j, (xj, zj) in baby.items():
+            if flags[w * D + j] or flags[w * D - j]:
+                acc = acc * (xt * zj - xj * zt) % n
+        (xtp, ztp), (xt, zt) = (xt, zt), _xadd(xt, zt, xD, zD, xtp, ztp, n)
+        w += 1
+    g = gmpy2.gcd(acc, n)
+    return g if 1 < g < n else None
+
+
+def _ecm(n: mpz, schedule=ECM_SCHEDULE) -> Optional[mpz]:
+    for B1, curves in schedule:
+        for _ in range(curves):
+            d = _ecm_curve(n, B1, 50 * B1)
+            if d is not None:
+                return d
+    return None
+
+
+# === Ghép các tầng ===
+
+def _split(n: mpz) -> mpz:
+    """Một ước không tầm thường của hợp số n (n không có ước nhỏ)."""
+    if gmpy2.is_square(n):
+        return gmpy2.isqrt(n)
+    d = _pollard_pm1(n)
+    if d is None:
+        d = _brent_rho(n, RHO_ITERATIONS)
+    if d is None:
+        d = _ecm(n)
+    if d is None:
+        d = _brent_rho(n, None)
+    return d
+
+
+_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def factorize(n: int, trial_bound: int = TRIAL_BOUND) -> Dict[int, int]:
+    """
+    Phân tích n thành thừa số nguyên tố, trả về dict {prime: exponent}.
+    Các tầng: chia thử bánh xe tới trial_bound → Pollard p-1 → Brent rho → ECM.
+    Kết quả được nhớ (LRU) vì p-1 thường được phân tích lặp lại cho cùng p.
+    """
+    if n <= 1:
+        return {}
+    key = int(n)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return dict(_cache[key])
+
+    out: Dict[int, int] = {}
+    rest = _wheel_trial_division(mpz(n), trial_bound, out)
+    # danh sách các phần chưa phân tích xong; mỗi phần chỉ kiểm tra nguyên tố một lần
+    pending = [rest] if rest > 1 else []
+    while pending:
+        m = pending.pop()
+        if _is_probable_prime(m):
+            out[int(m)] = out.get(int(m), 0) + 1
+            continue
+        d = _split(m)
+        e = m // d
+        # tách luôn các lũy thừa chung để không phân tích lại cùng một thừa số
+        g = gmpy2.gcd(d, e)
+        if g > 1 and g != d and g != e:
+            pending.extend([g, d // g, e])
+        else:
+            pending.extend([d, e])
+
+    result = dict(sorted(out.items()))
+    with _cache_lock:
+        _cache[key] = tuple(result.items())
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+class FactorizeTest(unittest.TestCase):
+    def check(self, n, expected=None):
+        f = factorize(n)
+        product = 1
+        for p, e in f.items():
+            self.assertTrue(gmpy2.is_prime(p), p)
+            product *= p ** e
+        self.assertEqual(product, n)
+        if expected is not None:
+            self.assertEqual(f, expected)
+
+    def test_small(self):
+        self.assertEqual(factorize(1), {})
+        for n in range(2, 3000):
+            self.check(n)
+        self.check(2 ** 64, {2: 64})
+        self.check(3 ** 5 * 7 ** 3 * 65537 ** 2, {3: 5, 7: 3, 65537: 2})
+
+    def test_products_of_random_primes(self):
+        state = gmpy2.random_state(11)
+        for bits in (16, 24, 32, 40):
+            for _ in range(3):
+                ps = [int(gmpy2.next_prime(gmpy2.mpz_urandomb(state, bits) | (1 << (bits - 1)))) for _ in range(3)]
+                expected: Dict[int, int] = {}
+                n = 1
+                for p, e in zip(ps, (1, 2, 1)):
+                    expected[p] = expected.get(p, 0) + e
+                    n *= p ** e
+                self.check(n, expected)
+
+    def test_semiprimes(self):
+        state = gmpy2.random_state(13)
+        for bits in (30, 40, 50, 60):
+            p = int(gmpy2.next_prime(gmpy2.mpz_urandomb(state, bits) | (1 << (bits - 1))))
+            q = int(gmpy2.next_prime(p + int(gmpy2.mpz_urandomb(state, bits))))
+            self.check(p * q, {p: 1, q: 1})
+        # p - 1 trơn (Pollard p-1) và số nguyên tố lớn (không tách)
+        self.check(1000000007 * 1000000009)
+        big = int(gmpy2.next_prime(mpz(2) ** 127))
+        self.check(big, {big: 1})
+
+
+if __name__ == "__main__":
+    from .generate_prime import generate_prime
+    for bits in (64, 96, 128, 160):
+        n = generate_prime(bits // 2) * generate_prime(bits // 2)
+        t0 = time.time()
+        f = factorize(n)
+        print(f"{bits}-bit semiprime: {f} ({time.time() - t0:.2f}s)")
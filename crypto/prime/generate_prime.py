@@ -1,14 +1,19 @@
 import secrets
 import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
 import time
+import unittest
+from math import isqrt
+from typing import Dict
 
 try:
     import gmpy2
 except ImportError:
     raise ImportError("Bạn cần cài đặt gmpy2 trước: pip install gmpy2")
 
-from functools import partial
-
 
 # Sinh số nguyên tố cơ bản
 def _generate_candidate(bits: int):
@@ -23,18 +28,225 @@ def _next_prime(n):
     return gmpy2.next_prime(n)
 
 
-def _worker(bits, safe=False, *args):
-    """Tiến trình con: sinh prime (hoặc safe prime)."""
-    while True:
-        p = _next_prime(_generate_candidate(bits))
-        if not safe:
+# Sàng safe prime
+_SIEVE_BOUND = 1 << 15     # sàng bằng các số nguyên tố lẻ < 32768 (~3500 số)
+_SIEVE_WINDOW = 4096       # số ứng viên q trong một cửa sổ sàng
+
+
+def _odd_primes_below(bound: int) -> list:
+    """Sàng Eratosthenes: trả về các số nguyên tố lẻ < bound."""
+    flags = bytearray([1]) * bound
+    flags[0:2] = b"\x00\x00"
+    for i in range(2, isqrt(bound - 1) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytes(len(range(i * i, bound, i)))
+    return [i for i in range(3, bound, 2) if flags[i]]
+
+
+_SIEVE_PRIMES = _odd_primes_below(_SIEVE_BOUND)
+
+
+def _sieve_safe_window(q0: int, window: int = _SIEVE_WINDOW) -> bytearray:
+    """
+    Sàng kết hợp cho các ứng viên q = q0 + 2i (i < window, q0 lẻ).
+    flags[i] = 0 nếu q hoặc 2q+1 chia hết cho một số nguyên tố nhỏ r:
+    - r | q       <=> q ≡ 0 (mod r)
+    - r | 2q + 1  <=> q ≡ (r-1)/2 (mod r)
+    """
+    flags = bytearray([1]) * window
+    for r in _SIEVE_PRIMES:
+        s = q0 % r
+        inv2 = (r + 1) >> 1                     # nghịch đảo của 2 mod r
+        i = (-s * inv2) % r                     # q0 + 2i ≡ 0
+        flags[i::r] = bytes(len(range(i, window, r)))
+        j = (((r - 1) >> 1) - s) * inv2 % r     # q0 + 2j ≡ (r-1)/2
+        flags[j::r] = bytes(len(range(j, window, r)))
+    return flags
+
+
+def _search_safe_window(q0, bits: int, window: int = _SIEVE_WINDOW):
+    """
+    Tìm safe prime p = 2q + 1 (p có đúng 'bits' bit) với q trong cửa sổ bắt đầu từ q0.
+    Chỉ các ứng viên sống sót qua sàng mới được kiểm tra, q và p kiểm tra cùng nhau:
+    - Fermat cơ số 2 cho p (loại gần hết hợp số bằng một phép lũy thừa)
+    - Miller-Rabin đầy đủ cho q; khi q nguyên tố, 2^(p-1) ≡ 1 (mod p) đủ để
+      kết luận p nguyên tố (Pocklington, vì q > sqrt(p) và 2^2 ≢ 1 mod p).
+    Trả về p hoặc None nếu cửa sổ không có safe prime.
+    """
+    q0 = int(q0) | 1
+    flags = _sieve_safe_window(q0, window)
+    i = flags.find(1)
+    while i != -1:
+        q = gmpy2.mpz(q0 + 2 * i)
+        if q.bit_length() != bits - 1:
+            return None
+        p = 2 * q + 1
+        if gmpy2.powmod(2, p - 1, p) == 1 and gmpy2.is_prime(q):
             return p
+        i = flags.find(1, i + 1)
+    return None
+
+
+def _safe_prime_small(bits: int):
+    """Safe prime cho 'bits' nhỏ (q có thể trùng với số nguyên tố dùng để sàng)."""
+    while True:
         q = _next_prime(_generate_candidate(bits - 1))
-        p = 2*q + 1
-        if gmpy2.is_prime(p):
+        p = 2 * q + 1
+        if q.bit_length() == bits - 1 and gmpy2.is_prime(p):
             return p
 
 
+def _search_prime_window(n0, bits: int, window: int = _SIEVE_WINDOW):
+    """Tìm số nguyên tố 'bits'-bit trong đoạn [n0, n0 + 2*window) (next_prime tự sàng)."""
+    p = _next_prime(n0 - 1)
+    if p < n0 + 2 * window and p.bit_length() == bits:
+        return p
+    return None
+
+
+# Worker pool dùng lại giữa các lần sinh
+_cancelled_job = None   # mp.Value: id job lớn nhất đã bị hủy (đặt trong tiến trình con)
+
+
+def _init_worker(cancelled_job, nice: int = 0):
+    global _cancelled_job
+    _cancelled_job = cancelled_job
+    if nice:
+        os.nice(nice)
+
+
+def _job_cancelled(job_id: int) -> bool:
+    return _cancelled_job is not None and _cancelled_job.value >= job_id
+
+
+def _cancel_job(cancelled_job, job_id: int) -> None:
+    with cancelled_job.get_lock():
+        if cancelled_job.value < job_id:
+            cancelled_job.value = job_id
+
+
+def _segment_worker(job_id: int, bits: int, safe: bool, base, index: int, stride: int):
+    """
+    Quét các cửa sổ index, index + stride, index + 2*stride, ... bắt đầu từ base.
+    Mỗi worker nhận một 'index' khác nhau nên các đoạn tìm kiếm không giao nhau.
+    Trả về prime đầu tiên tìm được, hoặc None nếu job bị hủy / vượt quá 'bits' bit.
+    """
+    search = _search_safe_window if safe else _search_prime_window
+    width = bits - 1 if safe else bits
+    span = 2 * _SIEVE_WINDOW
+    n0 = base + span * index
+    while n0.bit_length() == width:
+        if _job_cancelled(job_id):
+            return None
+        p = search(n0, bits)
+        if p is not None:
+            if _cancelled_job is not None:
+                _cancel_job(_cancelled_job, job_id)
+            return p
+        n0 += span * stride
+    return None
+
+
+class PrimeGenerator:
+    """
+    Dịch vụ sinh số nguyên tố giữ một pool tiến trình ấm để dùng lại giữa các lần gọi.
+    - Mỗi job chia cho các worker những đoạn tìm kiếm rời nhau quanh một điểm ngẫu nhiên.
+    - Worker đầu tiên tìm thấy prime sẽ hủy job, các worker còn lại dừng ngay sau cửa sổ hiện tại.
+    - Có thể dùng chung giữa nhiều thread (các job được chạy tuần tự).
+    - nice > 0: worker chạy ở độ ưu tiên thấp (vd. refill nền), nhường CPU cho job tương tác;
+      khi đó job luôn chạy trong worker, kể cả với 1 worker, để không chiếm tiến trình gọi.
+    """
+
+    def __init__(self, workers: int = 4, nice: int = 0):
+        self.workers = workers
+        self.nice = nice
+        self._pool = None
+        self._pool_size = 0
+        self._cancelled_job = None
+        self._job_id = 0
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self, workers: int):
+        if self._pool is None or self._pool_size < workers:
+            self.close()
+            self._cancelled_job = mp.Value("q", self._job_id)
+            self._pool = mp.Pool(workers, initializer=_init_worker, initargs=(self._cancelled_job, self.nice))
+            self._pool_size = workers
+        return self._pool
+
+    def generate(self, bits: int = 1024, safe: bool = False, workers: int | None = None):
+        """
+        Sinh số nguyên tố 'bits'-bit.
+        - safe: True → safe prime
+        - workers: số worker cho job này (mặc định self.workers; <= 1 → chạy ngay trong tiến trình)
+        """
+        workers = self.workers if workers is None else workers
+        if safe and bits - 1 <= _SIEVE_BOUND.bit_length():
+            return _safe_prime_small(bits)
+        width = bits - 1 if safe else bits
+        if workers <= 1 and not self.nice:
+            while True:
+                p = _segment_worker(0, bits, safe, _generate_candidate(width), 0, 1)
+                if p is not None:
+                    return p
+
+        with self._lock:
+            workers = max(1, workers)
+            pool = self._ensure_pool(workers)
+            while True:
+                self._job_id += 1
+                job_id = self._job_id
+                base = _generate_candidate(width)
+                results: queue.Queue = queue.Queue()
+                for i in range(workers):
+                    pool.apply_async(_segment_worker, (job_id, bits, safe, base, i, workers),
+                                     callback=results.put, error_callback=results.put)
+                for _ in range(workers):
+                    p = results.get()
+                    if isinstance(p, BaseException):
+                        _cancel_job(self._cancelled_job, job_id)
+                        raise p
+                    if p is not None:
+                        _cancel_job(self._cancelled_job, job_id)
+                        return p
+
+    def map(self, func, items, chunksize: int = 1, workers: int | None = None) -> list:
+        """
+        pool.map trên pool tiến trình ấm (cùng khóa job với generate), để các lô việc khác
+        như is_prime_many(..., pool=generator) không phải tạo và hủy pool mỗi lần gọi.
+        """
+        with self._lock:
+            pool = self._ensure_pool(max(1, self.workers if workers is None else workers))
+            return pool.map(func, items, chunksize)
+
+    def close(self) -> None:
+        """Dừng pool tiến trình (sẽ được tạo lại ở lần generate kế tiếp)."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_size = 0
+
+    def __enter__(self) -> "PrimeGenerator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_default_generator: PrimeGenerator | None = None
+_default_generator_lock = threading.Lock()
+
+
+def get_prime_generator() -> PrimeGenerator:
+    """PrimeGenerator dùng chung trong tiến trình (tạo lần đầu khi cần)."""
+    global _default_generator
+    with _default_generator_lock:
+        if _default_generator is None:
+            _default_generator = PrimeGenerator()
+        return _default_generator
+
+
 # Hàm chính
 def generate_prime(bits=1024, safe=False, workers=4):
     """
@@ -42,19 +254,156 @@ def generate_prime(bits=1024, safe=False, workers=4):
     - bits: độ dài bit (512, 1024, 2048, ...)
     - safe: True → sinh safe prime (p và (p-1)/2 đều prime)
     - workers: số CPU core sử dụng
+    Dùng pool ấm của get_prime_generator() thay vì tạo pool mới mỗi lần gọi.
+    """
+    return get_prime_generator().generate(bits, safe=safe, workers=workers)
+
+
+# Số nguyên tố với phân tích p - 1 biết trước
+class FactoredPrime(int):
+    """
+    Số nguyên tố p (dùng như int bình thường) kèm phân tích của p - 1 trong 'factors'.
+    Nhờ đó kiểm tra primitive root chỉ cần k phép lũy thừa, không phải phân tích lại.
     """
-    with mp.Pool(workers) as pool:
-        # results = [pool.apply_async(_worker, (bits, safe)) for _ in range(workers)]
-        # for r in results:
-        #     p = r.get()
-        #     if p:
-        #         pool.terminate()
-        #         return p
-        func = partial(_worker, bits, safe)
-        for p in pool.imap_unordered(func, range(workers)):
-            if p:
-                pool.terminate()
-                return p
+
+    def __new__(cls, p: int, factors: Dict[int, int]):
+        obj = super().__new__(cls, p)
+        obj.factors = dict(factors)
+        return obj
+
+    def __reduce__(self):
+        # int.__reduce__ mặc định gọi lại __new__ thiếu 'factors' (pickle, mp.Pool)
+        return (FactoredPrime, (int(self), self.factors))
+
+    def __repr__(self) -> str:
+        return f"FactoredPrime({int(self)}, factors={self.factors})"
+
+
+def generate_prime_with_factors(bits: int = 1024, factor_bits: int = 256, attempts: int = 4096) -> FactoredPrime:
+    """
+    Sinh prime p = 2·q1·q2·…·qk + 1 có đúng 'bits' bit, với các qi là prime ~'factor_bits' bit.
+    - q1..q(k-1) sinh ngẫu nhiên; qk được chọn trong khoảng sao cho p có đúng 'bits' bit
+    - sau 'attempts' lần thử qk không được thì sinh lại q1..q(k-1)
+    Trả về FactoredPrime với factors = {2: 1, q1: 1, ..., qk: 1}.
+    """
+    if bits < 8 or factor_bits < 4:
+        raise ValueError("bits và factor_bits quá nhỏ")
+    k = max(1, -(-(bits - 1) // factor_bits))
+    fixed_bits = (bits - 1) // k
+    while True:
+        qs = [_next_prime(_generate_candidate(fixed_bits)) for _ in range(k - 1)]
+        Q = 2
+        for q in qs:
+            Q *= q
+        lo = -(-(1 << (bits - 1)) // Q)           # Q·qk + 1 >= 2^(bits-1)
+        hi = ((1 << bits) - 2) // Q               # Q·qk + 1 <  2^bits
+        if lo > hi:
+            continue
+        for _ in range(attempts):
+            qk = _next_prime(lo + secrets.randbelow(hi - lo + 1) - 1)
+            if qk > hi:
+                continue
+            p = Q * qk + 1
+            # Fermat cơ số 2 loại nhanh trước khi kiểm tra đầy đủ
+            if gmpy2.powmod(2, p - 1, p) == 1 and gmpy2.is_prime(p):
+                factors: Dict[int, int] = {2: 1}
+                for q in qs + [qk]:
+                    factors[int(q)] = factors.get(int(q), 0) + 1
+                return FactoredPrime(p, factors)
+
+
+# Nhóm Schnorr: p = r·q + 1 với q nguyên tố nhỏ (224/256 bit)
+def _sieve_linear_window(t0: int, step: int, window: int = _SIEVE_WINDOW) -> bytearray:
+    """flags[i] = 0 nếu step·(t0 + i) + 1 chia hết cho một số nguyên tố lẻ nhỏ."""
+    flags = bytearray([1]) * window
+    for r in _SIEVE_PRIMES:
+        a = step % r
+        if a == 0:
+            continue
+        # step·(t0 + i) ≡ -1 (mod r)  <=>  i ≡ -1/step - t0 (mod r)
+        i = (-gmpy2.invert(a, r) - t0) % r
+        flags[i::r] = bytes(len(range(i, window, r)))
+    return flags
+
+
+def generate_schnorr_prime(bits: int = 2048, q_bits: int = 256) -> tuple:
+    """
+    Sinh (p, q) với q là prime 'q_bits'-bit và p = r·q + 1 là prime 'bits'-bit (r chẵn).
+    Z_p^* khi đó có nhóm con cấp q, dùng cho khóa và nonce ngắn (mod q).
+    Các ứng viên p = 2q·t + 1 (t liên tiếp) được sàng trước khi kiểm tra.
+    """
+    if q_bits >= bits - 1:
+        raise ValueError("q_bits phải nhỏ hơn bits - 1")
+    q = _next_prime(_generate_candidate(q_bits))
+    while q.bit_length() != q_bits:
+        q = _next_prime(_generate_candidate(q_bits))
+    step = 2 * q
+    lo = -(-(1 << (bits - 1)) // step)           # p = 2q·t + 1 >= 2^(bits-1)
+    hi = ((1 << bits) - 2) // step               # p < 2^bits
+    while True:
+        t0 = lo + secrets.randbelow(hi - lo + 1)
+        flags = _sieve_linear_window(t0, step) if bits > _SIEVE_BOUND.bit_length() else bytearray([1]) * _SIEVE_WINDOW
+        i = flags.find(1)
+        while i != -1 and t0 + i <= hi:
+            p = step * (t0 + i) + 1
+            if gmpy2.powmod(2, p - 1, p) == 1 and gmpy2.is_prime(p):
+                return p, q
+            i = flags.find(1, i + 1)
+
+
+class GeneratePrimeTest(unittest.TestCase):
+    def test_safe_primes(self):
+        for bits in (8, 12, 17, 64, 256, 512):
+            p = PrimeGenerator(workers=1).generate(bits, safe=True)
+            self.assertEqual(p.bit_length(), bits)
+            self.assertTrue(gmpy2.is_prime(p) and gmpy2.is_prime((p - 1) // 2), p)
+
+    def test_primes(self):
+        for bits in (16, 64, 256, 1024):
+            p = PrimeGenerator(workers=1).generate(bits)
+            self.assertEqual(p.bit_length(), bits)
+            self.assertTrue(gmpy2.is_prime(p), p)
+
+    def test_sieve_safe_window(self):
+        q0 = int(_generate_candidate(80))
+        flags = _sieve_safe_window(q0)
+        for i in range(_SIEVE_WINDOW):
+            q = q0 + 2 * i
+            survives = all(q % r and (2 * q + 1) % r for r in _SIEVE_PRIMES)
+            self.assertEqual(bool(flags[i]), survives, i)
+
+    def test_pool_reused(self):
+        with PrimeGenerator(workers=2) as generator:
+            p = generator.generate(256, safe=True)
+            pool = generator._pool
+            self.assertIsNotNone(pool)
+            q = generator.generate(256)
+            self.assertIs(generator._pool, pool)
+            self.assertEqual(generator.map(abs, [-1, -2, 3]), [1, 2, 3])
+            self.assertIs(generator._pool, pool)
+            # job trước đã bị hủy nhưng không làm hỏng job sau
+            self.assertNotEqual(p, q)
+            self.assertTrue(gmpy2.is_prime((p - 1) // 2) and gmpy2.is_prime(q))
+        self.assertIsNone(generator._pool)
+
+    def test_prime_with_factors(self):
+        for bits, factor_bits in ((64, 16), (256, 64), (512, 256)):
+            p = generate_prime_with_factors(bits, factor_bits)
+            self.assertEqual(p.bit_length(), bits)
+            self.assertTrue(gmpy2.is_prime(p))
+            product = 1
+            for q, e in p.factors.items():
+                self.assertTrue(gmpy2.is_prime(q), q)
+                product *= q ** e
+            self.assertEqual(product, p - 1)
+
+    def test_factored_prime_pickle(self):
+        p = generate_prime_with_factors(128, 32)
+        for q in (pickle.loads(pickle.dumps(p)), pickle.loads(pickle.dumps(p, protocol=0))):
+            self.assertIsInstance(q, FactoredPrime)
+            self.assertEqual((int(q), q.factors), (int(p), p.factors))
+        with mp.Pool(1) as pool:
+            self.assertEqual(pool.apply(getattr, (p, "factors")), p.factors)
 
 
 # Kiểm tra chạy thử
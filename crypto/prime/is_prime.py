@@ -1,94 +1,228 @@
-import random
-from gmpy2 import powmod
+import time
+import unittest
+import multiprocessing as mp
+import gmpy2
+from gmpy2 import mpz, powmod
+from typing import Iterable, List
+
+from .generate_prime import _odd_primes_below
 
 _small_primes = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43,
                  47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97]
+_SMALL_PRIMORIAL = mpz(1)     # 2·3·5·…·97: chia thử bằng một phép gcd
 
-def _trail_division(n: int) -> bool:
-    if n < 2:
-        return False
-    for p in _small_primes:
-        if n % p == 0:
-            return False
-    return True
+_BATCH_BOUND = 1 << 15
+_BATCH_PRIMES = set([2] + _odd_primes_below(_BATCH_BOUND))
+_PRIMORIAL = mpz(1)           # tích mọi số nguyên tố < _BATCH_BOUND (~47000 bit)
+for _p in sorted(_BATCH_PRIMES):
+    _PRIMORIAL *= _p
+    if _p <= _small_primes[-1]:
+        _SMALL_PRIMORIAL *= _p
 
-def _miller_rabin(n: int, rounds: int = 10) -> bool:
-    if n < 2:
-        return False
-    if n in _small_primes:
-        return True
-    if any(n % p == 0 for p in _small_primes):
-        return False
+def _trail_division(n: mpz) -> bool:
+    """True nếu n không có ước nào trong _small_primes."""
+    return gmpy2.gcd(n, _SMALL_PRIMORIAL) == 1
 
-    d, s = 0, n - 1
-    while s % 2 == 0:
-        d += 1
-        s //= 2
-
-    for _ in range(rounds):
-        a = random.randint(2, n - 2)
-        x = powmod(a, s, n)
-        if x == 1 or x == n - 1:
-            continue
-        for _ in range(d - 1):
-            x = powmod(x, 2, n)
-            if x == n - 1:
-                break
-        else:
-            return False
-    return True
+def _strong_prp_base2(n: mpz) -> bool:
+    """Miller–Rabin mạnh với cơ số 2 (n lẻ > 2)."""
+    d, s = n - 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+    x = powmod(2, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
 
-def _jacobi(a: int, n: int) -> int:
-    if n <= 0 or n % 2 == 0:
+def _selfridge_d(n: mpz) -> int:
+    """
+    Tham số Selfridge (method A): D đầu tiên trong 5, -7, 9, -11, ... có Jacobi(D/n) = -1.
+    Trả về 0 nếu phát hiện n là hợp số (n chính phương hoặc gcd(D, n) không tầm thường).
+    """
+    if gmpy2.is_square(n):
         return 0
-    a = a % n
-    result = 1
-    while a != 0:
-        while a % 2 == 0:
-            a //= 2
-            if n % 8 in [3, 5]:
-                result = -result
-        a, n = n, a
-        if a % 4 == 3 and n % 4 == 3:
-            result = -result
-        a %= n
-    if n == 1:
-        return result
-    return 0
-
-def _lucas_prp(n: int) -> bool:
-    """Kiểm tra nguyên tố theo Lucas probable prime."""
-    # Tìm P sao cho D = P^2 - 4 có Jacobi(D/n) = -1
-    for P in range(3, 100):
-        D = P * P - 4
-        if _jacobi(D, n) == -1:
-            break
-    else:
+    D = 5
+    while True:
+        j = gmpy2.jacobi(D, n)
+        if j == -1:
+            return D
+        if j == 0 and abs(D) != n:
+            return 0
+        D = -D - 2 if D > 0 else -D + 2
+
+def _strong_lucas_prp(n: mpz) -> bool:
+    """
+    Kiểm tra Lucas mạnh với P = 1, Q = (1 - D)/4 (n lẻ, không chính phương).
+    n + 1 = d·2^s; n là strong Lucas PRP nếu U_d ≡ 0 hoặc V_{d·2^r} ≡ 0 với r nào đó < s.
+    Dãy U, V, Q^k được tính bằng chuỗi nhị phân trên mpz.
+    """
+    D = _selfridge_d(n)
+    if D == 0:
         return False
+    Q = (1 - D) // 4
+    d, s = n + 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
 
-    # Dãy Lucas
-    def lucas_uv(P, D, k, n):
-        U, V = 0, 2
-        inv2 = powmod(2, -1, n)
-        for bit in bin(k)[2:]:
-            U, V = (U * V) % n, (V * V - 2) % n
-            if bit == "1":
-                U, V = (P * U + V) * inv2 % n, (D * U + P * V) * inv2 % n
-        return U, V
+    U, V, Qk = mpz(1), mpz(1), mpz(Q % n)     # k = 1
+    for bit in range(d.bit_length() - 2, -1, -1):
+        # k → 2k
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if d.bit_test(bit):
+            # k → k + 1 (P = 1); chia 2 mod n: cộng n nếu lẻ
+            U, V = U + V, D * U + V
+            if U & 1:
+                U += n
+            if V & 1:
+                V += n
+            U = (U >> 1) % n
+            V = (V >> 1) % n
+            Qk = Qk * Q % n
+
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
 
-    U, V = lucas_uv(P, D, n + 1, n)
-    return U == 0
+def _probable_prime(n: int) -> bool:
+    """Baillie–PSW: Miller–Rabin mạnh cơ số 2 + Lucas mạnh (n lẻ, không có ước nhỏ)."""
+    n = mpz(n)
+    return _strong_prp_base2(n) and _strong_lucas_prp(n)
 
 def is_prime(n: int) -> bool:
-    """Kiểm tra số nguyên tố sử dụng kết hợp các phương pháp."""
-    if n < 2:
-        return False
-    if n in _small_primes:
-        return True
+    """
+    Kiểm tra số nguyên tố bằng Baillie–PSW.
+    - n < 2^15: tra bảng
+    - chia thử bằng gcd với tích các số nguyên tố <= 97
+    - Miller–Rabin mạnh cơ số 2, rồi Lucas mạnh với tham số Selfridge
+    """
+    n = mpz(n)
+    if n < _BATCH_BOUND:
+        return int(n) in _BATCH_PRIMES
     if not _trail_division(n):
         return False
-    if not _miller_rabin(n):
-        return False
-    if not _lucas_prp(n):
-        return False
-    return True
\ No newline at end of file
+    return _probable_prime(n)
+
+# === Kiểm tra theo lô ===
+def _product_tree(values: List[gmpy2.mpz]) -> List[List[gmpy2.mpz]]:
+    """Cây tích: tree[0] = values, tree[-1] = [tích tất cả]."""
+    tree = [values]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append([level[i] * level[i + 1] if i + 1 < len(level) else level[i]
+                     for i in range(0, len(level), 2)])
+    return tree
+
+def _remainder_tree(x: gmpy2.mpz, tree: List[List[gmpy2.mpz]]) -> List[gmpy2.mpz]:
+    """x mod mọi lá của cây tích, đi từ gốc xuống (mỗi tầng chỉ chia cho số nhỏ hơn)."""
+    remainders = [x % tree[-1][0]]
+    for level in reversed(tree[:-1]):
+        remainders = [remainders[i // 2] % v for i, v in enumerate(level)]
+    return remainders
+
+def is_prime_many(numbers: Iterable[int], workers: int = 1, pool=None) -> List[bool]:
+    """
+    Kiểm tra nguyên tố cho nhiều số cùng lúc, trả về list bool theo đúng thứ tự.
+    - Sàng chung: primorial mod n_i qua cây tích/cây dư, rồi gcd(·, n_i) > 1 → có ước nhỏ.
+    - Chỉ các số sống sót mới chạy kiểm tra xác suất (Miller–Rabin + Lucas).
+    - pool: đối tượng có map(func, items, chunksize) dùng lại giữa các lần gọi
+      (multiprocessing.Pool hoặc PrimeGenerator); ưu tiên hơn workers.
+    - workers > 1 (không có pool): tạo pool tạm cho riêng lần gọi này.
+    """
+    values = [gmpy2.mpz(n) for n in numbers]
+    results = [False] * len(values)
+    large: List[int] = []
+    for i, n in enumerate(values):
+        if n < _BATCH_BOUND:
+            results[i] = int(n) in _BATCH_PRIMES
+        else:
+            large.append(i)
+    if not large:
+        return results
+
+    tree = _product_tree([values[i] for i in large])
+    remainders = _remainder_tree(_PRIMORIAL, tree)
+    survivors = [i for i, r in zip(large, remainders) if gmpy2.gcd(r, values[i]) == 1]
+
+    candidates = [values[i] for i in survivors]
+    if pool is not None and len(candidates) > 1:
+        size = getattr(pool, "workers", None) or getattr(pool, "_processes", None) or workers
+        verdicts = pool.map(_probable_prime, candidates, max(1, len(candidates) // (4 * max(1, size))))
+    elif workers > 1 and len(candidates) > 1:
+        with mp.Pool(workers) as tmp_pool:
+            verdicts = tmp_pool.map(_probable_prime, candidates, chunksize=max(1, len(candidates) // (4 * workers)))
+    else:
+        verdicts = [_probable_prime(n) for n in candidates]
+    for i, ok in zip(survivors, verdicts):
+        results[i] = ok
+    return results
+
+class IsPrimeTest(unittest.TestCase):
+    # số giả nguyên tố mạnh cơ số 2 và số giả nguyên tố Lucas mạnh (Selfridge) — BPSW phải loại cả hai
+    STRONG_PSEUDOPRIMES_BASE2 = [2047, 3277, 4033, 4681, 8321, 15841, 29341, 42799, 49141, 52633, 65281,
+                                 74665, 80581, 85489, 88357, 90751, 3215031751, 3825123056546413051]
+    STRONG_LUCAS_PSEUDOPRIMES = [5459, 5777, 10877, 16109, 18971, 22499, 24569, 25199, 40309, 58519, 75077, 97439]
+    CARMICHAEL = [561, 1105, 1729, 2465, 2821, 6601, 8911, 41041, 62745, 63973, 75361, 101101, 126217, 172081]
+
+    def test_matches_gmpy2(self):
+        for n in list(range(-5, 1 << 16)) + list(range((1 << 32) - 5000, (1 << 32) + 5000)):
+            self.assertEqual(is_prime(n), bool(gmpy2.is_prime(n)) and n > 1, n)
+        state = gmpy2.random_state(11)
+        for bits in (64, 128, 512, 1024):
+            for _ in range(20):
+                n = gmpy2.mpz_urandomb(state, bits) | 1
+                self.assertEqual(is_prime(n), bool(gmpy2.is_prime(n)))
+                p = gmpy2.next_prime(n)
+                self.assertTrue(is_prime(p))
+                self.assertFalse(is_prime(p * gmpy2.next_prime(p)))
+
+    def test_pseudoprimes(self):
+        for n in self.STRONG_PSEUDOPRIMES_BASE2 + self.CARMICHAEL:
+            self.assertFalse(is_prime(n), n)
+        for n in self.STRONG_PSEUDOPRIMES_BASE2[5:16]:
+            self.assertTrue(_strong_prp_base2(mpz(n)), n)   # đúng là qua được Miller–Rabin cơ số 2
+        for n in self.STRONG_LUCAS_PSEUDOPRIMES:
+            self.assertFalse(is_prime(n), n)
+            self.assertTrue(_strong_lucas_prp(mpz(n)), n)   # đúng là qua được Lucas mạnh
+
+    def test_many(self):
+        state = gmpy2.random_state(5)
+        numbers = [0, 1, 2, 97, 32749, 1 << 15, 3215031751] + self.STRONG_LUCAS_PSEUDOPRIMES
+        for _ in range(30):
+            n = gmpy2.mpz_urandomb(state, 256)
+            numbers += [n, gmpy2.next_prime(n)]
+        expected = [is_prime(n) for n in numbers]
+        self.assertEqual(is_prime_many(numbers), expected)
+        self.assertEqual(is_prime_many([]), [])
+        with mp.Pool(2) as pool:
+            self.assertEqual(is_prime_many(numbers, pool=pool), expected)
+            self.assertEqual(is_prime_many(numbers[::-1], pool=pool), expected[::-1])
+        from .generate_prime import PrimeGenerator
+        with PrimeGenerator(workers=2) as generator:
+            self.assertEqual(is_prime_many(numbers, pool=generator), expected)
+            first = generator._pool
+            self.assertEqual(is_prime_many(numbers, pool=generator), expected)
+            self.assertIs(generator._pool, first)
+
+if __name__ == "__main__":
+    # So sánh tốc độ với gmpy2.is_prime (mặc định 25 vòng Miller–Rabin)
+    from .generate_prime import _generate_candidate
+    for bits in (512, 1024, 2048, 4096):
+        primes = [gmpy2.next_prime(_generate_candidate(bits)) for _ in range(5)]
+        t0 = time.time()
+        assert all(is_prime(p) for p in primes)
+        t1 = time.time()
+        assert all(gmpy2.is_prime(p) for p in primes)
+        t2 = time.time()
+        print(f"{bits}-bit: is_prime {(t1 - t0) / 5 * 1000:.1f} ms, gmpy2.is_prime {(t2 - t1) / 5 * 1000:.1f} ms")
\ No newline at end of file
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import deque
+from unittest import mock
+
+import gmpy2
+
+from .generate_prime import PrimeGenerator, get_prime_generator
+from .is_prime import is_prime_many
+from .prime_root import find_primitive_root
+
+from typing import Dict, Iterable, Optional, Tuple
+
+_STORE_VERSION = 1
+_RETRY_SECONDS = 1.0        # chờ sau lần refill lỗi đầu tiên, nhân đôi mỗi lần lỗi liên tiếp
+_MAX_RETRY_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def _is_generator(p: int, g: int) -> bool:
+    """
+    Với safe prime p = 2q + 1, cấp của g chỉ có thể là 1, 2, q hoặc 2q:
+    g là primitive root ⇔ g ≠ ±1 và g^q ≠ 1, tức g không chính phương (Legendre(g, p) = -1).
+    """
+    return 1 < g < p - 1 and gmpy2.legendre(g, p) == -1
+
+
+class ParameterPoolStats:
+    """Bộ đếm cho một kích thước bit trong ParameterPool."""
+
+    def __init__(self):
+        self.hits = 0              # lấy được (p, g) có sẵn
+        self.misses = 0            # pool rỗng, phải sinh đồng bộ
+        self.generated = 0         # số cặp sinh bởi luồng nền
+        self.refill_seconds = 0.0  # tổng thời gian sinh của luồng nền
+        self.errors = 0            # số lần luồng nền sinh lỗi
+
+    def as_dict(self) -> dict:
+        avg = self.refill_seconds / self.generated if self.generated else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "refill_seconds": self.refill_seconds,
+            "avg_refill_seconds": avg,
+            "errors": self.errors,
+        }
+
+
+class ParameterPool:
+    """
+    Kho tham số nhóm (p, g) sinh sẵn cho ElGamal, phân theo số bit.
+    - Luồng nền giữ mỗi kích thước ở mức giữa low_watermark và capacity:
+      khi số cặp còn lại <= low_watermark thì sinh thêm đến khi đầy capacity.
+    - take()/get() lấy một cặp trong O(1); mỗi cặp chỉ được phát ra một lần.
+    - Nếu có 'path', kho được lưu ra đĩa (JSON) và nạp lại khi khởi động;
+      validate=True (mặc định) kiểm tra lại mọi cặp nạp từ đĩa: p và (p-1)/2 nguyên tố (theo lô),
+      g là primitive root mod p. Chỉ tắt khi file kho chắc chắn không bị người khác ghi.
+      File kho hỏng (JSON cụt, sai cấu trúc) chỉ được ghi log, pool khởi động với kho rỗng.
+    - Lỗi trong luồng nền được ghi log; luồng chờ (tăng dần tới _MAX_RETRY_SECONDS) rồi thử lại.
+    p là safe prime, g là primitive root mod p (giống ElGamal_generate_keys).
+    """
+
+    def __init__(
+        self,
+        sizes: Iterable[int],
+        capacity: int = 8,
+        low_watermark: int = 2,
+        path: Optional[str] = None,
+        prime_generator: Optional[PrimeGenerator] = None,
+        capacities: Optional[Dict[int, int]] = None,
+        start: bool = True,
+        validate: bool = True,
+        refill_generator: Optional[PrimeGenerator] = None,
+    ):
+        if low_watermark >= capacity:
+            raise ValueError("low_watermark phải nhỏ hơn capacity")
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.capacities = {bits: capacity for bits in sizes}
+        self.capacities.update(capacities or {})
+        self.path = path
+        self.prime_generator = prime_generator
+        # generator riêng cho luồng nền (vd. ít worker, nice cao); get() khi kho trống vẫn dùng prime_generator
+        self.refill_generator = refill_generator
+
+        self._params: Dict[int, deque] = {bits: deque() for bits in self.capacities}
+        self._stats: Dict[int, ParameterPoolStats] = {bits: ParameterPoolStats() for bits in self.capacities}
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        if path and os.path.exists(path):
+            self._load(validate)
+        if start:
+            self.start()
+
+    # === Lấy tham số ===
+
+    def take(self, bits: int) -> Optional[Tuple[int, int]]:
+        """Lấy ngay một cặp (p, g) 'bits'-bit, hoặc None nếu kho đang rỗng."""
+        with self._cond:
+            params = self._params.get(bits)
+            if not params:
+                if params is not None:
+                    self._stats[bits].misses += 1
+                    self._cond.notify()
+                return None
+            pair = params.popleft()
+            self._stats[bits].hits += 1
+            self._dirty = True
+            self._cond.notify()
+            return pair
+
+    def get(self, bits: int) -> Tuple[int, int]:
+        """Như take(), nhưng sinh đồng bộ nếu kho không có sẵn."""
+        pair = self.take(bits)
+        if pair is None:
+            pair = self._generate(bits)
+        return pair
+
+    def level(self, bits: int) -> int:
+        with self._cond:
+            return len(self._params.get(bits, ()))
+
+    def stats(self) -> Dict[int, dict]:
+        """Trạng thái từng kích thước: số cặp hiện có, capacity và các bộ đếm refill."""
+        with self._cond:
+            return {
+                bits: {"level": len(self._params[bits]), "capacity": self.capacities[bits], **self._stats[bits].as_dict()}
+                for bits in self.capacities
+            }
+
+    # === Luồng nền ===
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._closed = False
+            self._thread = threading.Thread(target=self._refill_loop, name="elgamal-parameter-pool", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Dừng luồng nền (sau khi cặp đang sinh hoàn tất) và lưu kho ra đĩa."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._save()
+
+    def __enter__(self) -> "ParameterPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _refill_loop(self) -> None:
+        # Lần đầu lấp đầy đến capacity; sau đó chỉ refill khi chạm low_watermark
+        filling = set(self.capacities)
+        failures = 0
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    filling.update(bits for bits in self.capacities if len(self._params[bits]) <= self.low_watermark)
+                    filling = {bits for bits in filling if len(self._params[bits]) < self.capacities[bits]}
+                    if filling or self._dirty:
+                        break
+                    self._cond.wait()
+                bits = min(filling, key=lambda b: len(self._params[b])) if filling else None
+            try:
+                if bits is not None:
+                    self._refill_one(bits)
+                self._save()
+            except Exception:
+                failures += 1
+                delay = min(_RETRY_SECONDS * 2 ** (failures - 1), _MAX_RETRY_SECONDS)
+                logger.exception("ParameterPool: luồng nền lỗi (bits=%s), thử lại sau %.1fs", bits, delay)
+                with self._cond:
+                    if bits is not None:
+                        self._stats[bits].errors += 1
+                    self._cond.wait_for(lambda: self._closed, timeout=delay)
+            else:
+                failures = 0
+
+    def _refill_one(self, bits: int) -> None:
+        t0 = time.perf_counter()
+        pair = self._generate(bits, self.refill_generator)
+        elapsed = time.perf_counter() - t0
+        with self._cond:
+            self._params[bits].append(pair)
+            self._stats[bits].generated += 1
+            self._stats[bits].refill_seconds += elapsed
+            self._dirty = True
+
+    def _generate(self, bits: int, generator: Optional[PrimeGenerator] = None) -> Tuple[int, int]:
+        generator = generator or self.prime_generator or get_prime_generator()
+        p = generator.generate(bits, safe=True)
+        g = find_primitive_root(p, safe=True)
+        return gmpy2.mpz(p), gmpy2.mpz(g)
+
+    # === Lưu trữ ===
+
+    def _load(self, validate: bool = True) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _STORE_VERSION:
+                return
+            for key, pairs in data.get("params", {}).items():
+                bits = int(key)
+                if bits not in self._params:
+                    continue
+                for p, g in pairs[: self.capacities[bits]]:
+                    p, g = gmpy2.mpz(p), gmpy2.mpz(g)
+                    if p.bit_length() == bits and 1 < g < p - 1:
+                        self._params[bits].append((p, g))
+        except (OSError, json.JSONDecodeError, ValueError, KeyError, TypeError, AttributeError):
+            # file kho hỏng không được chặn việc khởi động: bỏ qua và sinh lại từ đầu
+            logger.exception("ParameterPool: không đọc được kho %s, bắt đầu với kho rỗng", self.path)
+            for params in self._params.values():
+                params.clear()
+            return
+        if validate:
+            self._drop_invalid()
+
+    def _drop_invalid(self) -> None:
+        """
+        Loại các cặp có p không phải safe prime (kiểm tra p và q = (p-1)/2 trong một lô)
+        hoặc g không phải primitive root mod p.
+        """
+        entries = [(bits, pair) for bits, pairs in self._params.items() for pair in pairs]
+        # dùng lại pool tiến trình ấm của prime_generator (nếu có nhiều worker) thay vì tạo pool tạm
+        generator = self.prime_generator
+        pool = generator if generator is not None and generator.workers > 1 else None
+        checks = is_prime_many([n for _, (p, _g) in entries for n in (p, (p - 1) // 2)], pool=pool)
+        for bits in self._params:
+            self._params[bits].clear()
+        for i, (bits, (p, g)) in enumerate(entries):
+            if checks[2 * i] and checks[2 * i + 1] and _is_generator(p, g):
+                self._params[bits].append((p, g))
+
+    def _save(self) -> None:
+        with self._cond:
+            if not self._dirty:
+                return
+            self._dirty = False
+            if not self.path:
+                return
+            data = {
+                "version": _STORE_VERSION,
+                "params": {str(bits): [[str(p), str(g)] for p, g in pairs] for bits, pairs in self._params.items()},
+            }
+        # ghi file tạm rồi thay thế để không bao giờ để lại file hỏng
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            # giữ cờ dirty để lần lưu sau ghi lại
+            with self._cond:
+                self._dirty = True
+            raise
+
+
+class ParameterPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "params.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_persist_and_reload(self):
+        with ParameterPool([64], capacity=3, low_watermark=1, path=self.path) as pool:
+            p, g = pool.get(64)
+            self.assertTrue(gmpy2.is_prime(p) and gmpy2.is_prime((p - 1) // 2) and _is_generator(p, g))
+        reloaded = ParameterPool([64], capacity=3, low_watermark=1, path=self.path, start=False)
+        self.assertGreaterEqual(reloaded.level(64), 2)
+
+    def test_corrupt_store_starts_empty(self):
+        good = ParameterPool([64], capacity=3, low_watermark=1, start=False)._generate(64)
+        stores = [
+            '{"version": 1, "params": {"64": [["1',          # JSON cụt
+            '[1, 2, 3]',                                     # sai kiểu gốc
+            '{"version": 1, "params": {"64": [["abc", "2"]]}}',
+            '{"version": 1, "params": {"x": []}}',
+            '{"version": 1, "params": {"64": [[%d, %d], [1]]}}' % good,
+        ]
+        for text in stores:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(text)
+            with self.assertLogs(logger, "ERROR"):
+                pool = ParameterPool([64], capacity=3, low_watermark=1, path=self.path, start=False)
+            self.assertEqual(pool.level(64), 0)
+
+    def test_refill_survives_errors(self):
+        pool = ParameterPool([64], capacity=2, low_watermark=1, start=False)
+        generate = pool._generate
+        calls = []
+
+        def flaky(bits, generator=None):
+            calls.append(bits)
+            if len(calls) == 1:
+                raise RuntimeError("lỗi giả lập")
+            return generate(bits, generator)
+
+        with mock.patch.object(pool, "_generate", flaky), \
+                mock.patch(f"{__name__}._RETRY_SECONDS", 0.01), \
+                self.assertLogs(logger, "ERROR"):
+            pool.start()
+            deadline = time.time() + 10
+            while pool.level(64) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            pool.close()
+        self.assertEqual(pool.level(64), 2)
+        self.assertEqual(pool.stats()[64]["errors"], 1)
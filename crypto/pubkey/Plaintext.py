@@ -1,23 +1,65 @@
 # Plaintext.py
-from .strint import str_chunk_to_int, int_to_str_chunk
-from typing import List
+import unittest
+
+from .strint import BLOCK_MARKER, str_chunk_to_int, int_to_str_chunk, bytes_to_blocks, blocks_to_bytes, ints_to_str_chunks, is_packed_block, Buffer
+from typing import Iterable, List, Optional
+
+__all__ = ["GRANULARITY", "block_size_for", "detect_block_size", "Plaintext"]
 
 GRANULARITY = 15  # bạn có thể điều chỉnh; đây là số ký tự (not bytes) mỗi block
 
+def block_size_for(p: int) -> int:
+    """
+    Số byte dữ liệu mỗi block khi đóng gói theo modulus p:
+    marker + block_size byte < 256^(len(p) - 1) <= p, nên mọi block đều < p.
+    """
+    size = (p.bit_length() + 7) // 8 - 2
+    if size < 1:
+        raise ValueError("modulus quá nhỏ để đóng gói bản rõ")
+    return size
+
+def detect_block_size(numbers: Iterable[int], p: int) -> Optional[int]:
+    """
+    block_size_for(p) nếu mọi block đều mang marker đóng gói; None nếu không
+    (bản rõ cũ theo chunk GRANULARITY ký tự, vd. bản mã đã lưu trước khi có đóng gói theo khóa).
+    """
+    block_size = block_size_for(p)
+    return block_size if all(is_packed_block(number, block_size) for number in numbers) else None
+
 class Plaintext:
-    def __init__(self, numbers: List[int]):
+    def __init__(self, numbers: List[int], block_size: Optional[int] = None):
         # mỗi phần tử là số nguyên được tạo từ 1 chunk UTF-8 của chuỗi gốc
         self.numbers = list(numbers)
+        # None → chunk GRANULARITY ký tự như cũ; ngược lại mỗi số là BLOCK_MARKER + tối đa block_size byte
+        self.block_size = block_size
+    
+    def to_bytes(self) -> bytes:
+        """Dữ liệu gốc của Plaintext đóng gói (block_size); bản rõ cũ theo ký tự thì encode lại UTF-8."""
+        if self.block_size:
+            return blocks_to_bytes(self.numbers, self.block_size)
+        return self.to_string().encode("utf-8")
+    
+    @staticmethod
+    def from_bytes(data: Buffer, block_size: int) -> "Plaintext":
+        """Đóng gói bytes/bytearray/memoryview bất kỳ (không chỉ văn bản), không sao chép bộ đệm đầu vào."""
+        return Plaintext(bytes_to_blocks(data, block_size), block_size)
+    
+    def reblock(self, block_size: int) -> "Plaintext":
+        """Đóng gói lại cùng dữ liệu với block_size khác (vd. khi khóa ký và khóa mã hóa khác kích thước)."""
+        if self.block_size == block_size:
+            return self
+        return Plaintext.from_bytes(self.to_bytes(), block_size)
     
     def to_string(self) -> str:
         """
         Chuyển danh sách số về chuỗi: mỗi số -> bytes -> decode -> nối lại.
         Lưu ý: các chunk sẽ ghép lại, trả về chuỗi gốc (nếu từ_string dùng cùng GRANULARITY).
+        Với block_size: bỏ marker của từng block, ghép bytes rồi mới decode
+        (một ký tự UTF-8 có thể nằm vắt qua hai block).
         """
-        result = ""
-        for number in self.numbers:
-            result += int_to_str_chunk(number)
-        return result
+        if self.block_size:
+            return self.to_bytes().decode("utf-8")
+        return "".join(ints_to_str_chunks(self.numbers))
     
     def __repr__(self) -> str:
         return f"Plaintext({self.numbers})"
@@ -40,31 +82,85 @@ class Plaintext:
         # nếu các block giống nhau -> bằng
         if self._compare_numbers_only(other):
             return True
-        # nếu các block không giống nhưng tái tạo chuỗi giống nhau -> cũng bằng
-        return self.to_string() == other.to_string()
+        # nếu các block không giống nhưng tái tạo dữ liệu giống nhau -> cũng bằng
+        try:
+            return self.to_bytes() == other.to_bytes()
+        except (ValueError, UnicodeDecodeError):
+            return False
     
     @staticmethod
-    def from_string(s: str) -> "Plaintext":
+    def from_string(s: str, block_size: Optional[int] = None) -> "Plaintext":
         """
         Tạo Plaintext từ chuỗi bất kỳ (Unicode):
         - chia chuỗi thành các chunk mỗi GRANULARITY ký tự (không phải bytes)
         - mỗi chunk encode utf-8 -> bytes -> int
         - lưu list số nguyên
+        Nếu có block_size (xem block_size_for): đóng gói dày các byte UTF-8,
+        mỗi block = BLOCK_MARKER + block_size byte.
         """
-        numbers: List[int] = []
-        if s == "":
-            return Plaintext([])
-        
+        if block_size:
+            return Plaintext.from_bytes(s.encode("utf-8"), block_size)
         # chia theo số ký tự (GRANULARITY)
-        accumulation = ""
-        for ch in s:
-            accumulation += ch
-            if len(accumulation) == GRANULARITY:
-                numbers.append(str_chunk_to_int(accumulation))
-                accumulation = ""
-        if len(accumulation) > 0:
-            numbers.append(str_chunk_to_int(accumulation))
-        return Plaintext(numbers)
+        return Plaintext([str_chunk_to_int(s[i:i + GRANULARITY]) for i in range(0, len(s), GRANULARITY)])
+
+class PlaintextCodecTest(unittest.TestCase):
+    P_SMALL = (1 << 127) - 1    # block_size_for = 14
+    P_LARGE = (1 << 521) - 1    # block_size_for = 64
+
+    def roundtrip(self, data: bytes, block_size: int) -> Plaintext:
+        pt = Plaintext.from_bytes(data, block_size)
+        self.assertTrue(all(is_packed_block(n, block_size) for n in pt.numbers))
+        self.assertEqual(pt.to_bytes(), data)
+        return pt
+
+    def test_empty(self):
+        pt = self.roundtrip(b"", 14)
+        self.assertEqual(pt.numbers, [])
+        self.assertEqual(Plaintext.from_string("", 14).to_string(), "")
+        self.assertEqual(detect_block_size([], self.P_SMALL), 14)
+
+    def test_exact_multiple_lengths(self):
+        for k in (1, 2, 5):
+            data = bytes(range(1, 14 * k + 1))
+            pt = self.roundtrip(data, 14)
+            self.assertEqual(len(pt.numbers), k)
+            self.assertTrue(all(n >> (8 * 14) == BLOCK_MARKER[0] for n in pt.numbers))
+        for n in (13, 15, 27, 29):
+            self.assertEqual(len(self.roundtrip(bytes(n), 14).numbers), -(-n // 14))
+
+    def test_leading_zero_and_marker_bytes(self):
+        # block cuối (và block đầy) bắt đầu bằng 0x00 hoặc 0x01 không được mất byte nào
+        for data in (b"\x00", b"\x01", b"\x00\x00\x01", b"a" * 14 + b"\x00\x07", b"a" * 14 + b"\x01",
+                     b"\x00" * 14 + b"\x01" * 14, bytes(range(256))):
+            self.roundtrip(data, 14)
+            self.roundtrip(bytearray(data), 3)
+            self.roundtrip(memoryview(data), 64)
+
+    def test_reblock_between_moduli(self):
+        small, large = block_size_for(self.P_SMALL), block_size_for(self.P_LARGE)
+        self.assertEqual((small, large), (14, 64))
+        s = "Xin chào thế giới! " * 9
+        pt = Plaintext.from_string(s, small)
+        big = pt.reblock(large)
+        self.assertEqual(big.block_size, large)
+        self.assertEqual(len(big.numbers), -(-len(s.encode("utf-8")) // large))
+        self.assertTrue(all(n < self.P_LARGE for n in big.numbers))
+        self.assertEqual(big.to_string(), s)
+        self.assertEqual(big.reblock(small).numbers, pt.numbers)
+        self.assertIs(pt.reblock(small), pt)
+        self.assertEqual(big, pt)
+
+    def test_detect_block_size(self):
+        packed = Plaintext.from_string("Xin chào thế giới!", 14)
+        self.assertEqual(detect_block_size(packed.numbers, self.P_SMALL), 14)
+        legacy = Plaintext.from_string("Xin chào thế giới!")
+        self.assertIsNone(detect_block_size(legacy.numbers, self.P_SMALL))
+        self.assertIsNone(detect_block_size([0], self.P_SMALL))
+        # block dài hơn block_size của modulus → không phải bản rõ đóng gói theo khóa này
+        self.assertIsNone(detect_block_size(Plaintext.from_bytes(b"x" * 20, 64).numbers, self.P_SMALL))
+        with self.assertRaises(ValueError):
+            blocks_to_bytes(legacy.numbers, 14)
+
 
 if __name__ == "__main__":
     # test nhanh
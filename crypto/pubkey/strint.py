@@ -1,6 +1,20 @@
 # strint.py
 # Chuyển string <-> integer bằng cách encode UTF-8 và dùng base-256 (int.from_bytes / int.to_bytes)
-from typing import Tuple
+from typing import Iterable, List, Tuple, Union
+
+BLOCK_MARKER = b"\x01"  # byte đứng đầu mỗi block đóng gói theo khóa (giữ được các byte 0 ở đầu)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+__all__ = [
+    "BLOCK_MARKER",
+    "str_chunk_to_int",
+    "int_to_str_chunk",
+    "bytes_to_blocks",
+    "is_packed_block",
+    "blocks_to_bytes",
+    "ints_to_str_chunks",
+]
 
 def str_chunk_to_int(s: str) -> int:
     """
@@ -25,6 +39,51 @@ def int_to_str_chunk(n: int) -> str:
     b = n.to_bytes(length, "big")
     return b.decode("utf-8")
 
+def bytes_to_blocks(data: Buffer, block_size: int) -> List[int]:
+    """
+    Chuyển cả bộ đệm thành list block đóng gói: mỗi block = BLOCK_MARKER + tối đa block_size byte.
+    Cắt trên memoryview nên không tạo bản sao trung gian; marker được cộng bằng phép OR bit.
+    """
+    view = memoryview(data).cast("B")
+    n = len(view)
+    marker = BLOCK_MARKER[0]
+    full = marker << (8 * block_size)
+    numbers = [full | int.from_bytes(view[i:i + block_size], "big") for i in range(0, n - n % block_size, block_size)]
+    if n % block_size:
+        tail = view[n - n % block_size:]
+        numbers.append((marker << (8 * len(tail))) | int.from_bytes(tail, "big"))
+    return numbers
+
+def _payload_length(number: int) -> int:
+    """Số byte dữ liệu sau byte cao nhất (byte marker) của number."""
+    return (number.bit_length() + 7) // 8 - 1
+
+def is_packed_block(number: int, block_size: int) -> bool:
+    """Số có dạng BLOCK_MARKER + tối đa block_size byte (byte cao nhất đúng bằng BLOCK_MARKER)."""
+    length = _payload_length(number)
+    return 0 <= length <= block_size and number >> (8 * length) == BLOCK_MARKER[0]
+
+def blocks_to_bytes(numbers: Iterable[int], block_size: int) -> bytes:
+    """
+    Ngược lại của bytes_to_blocks: ghi phần dữ liệu của từng block vào một bytearray cấp phát trước.
+    Block không có marker hợp lệ hoặc dài hơn block_size → ValueError.
+    """
+    numbers = list(numbers)
+    lengths = []
+    for number in numbers:
+        if not is_packed_block(number, block_size):
+            raise ValueError("block không đúng định dạng đóng gói")
+        lengths.append(_payload_length(number))
+    out = bytearray(sum(lengths))
+    offset = 0
+    for number, length in zip(numbers, lengths):
+        out[offset:offset + length] = (number & ((1 << (8 * length)) - 1)).to_bytes(length, "big")
+        offset += length
+    return bytes(out)
+
+def ints_to_str_chunks(numbers: Iterable[int]) -> List[str]:
+    return [int_to_str_chunk(number) for number in numbers]
+
 if __name__ == "__main__":
     # test nhanh
     original = "Xin chào!"
@@ -1,4 +1,6 @@
 from . import *
+from .cli import main
+import sys
 from typing import Callable
 CHOICES: dict[str, Callable[[], None]] = {
     "1": run_CryptoElGamal,
@@ -6,6 +8,9 @@ CHOICES: dict[str, Callable[[], None]] = {
 }
 
 if __name__ == "__main__":
+    # có tham số → chế độ dòng lệnh không tương tác (xem cli.py)
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
     print("Select the operation to run:")
     print("1. ElGamal Public Key Cryptography")
     print("2. ElGamal Public Key Cryptography with Digital Signatures")
@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import json
+import os
+import struct
+import sys
+
+from typing import BinaryIO, Iterable, Iterator
+
+from ..pubkey import Plaintext, block_size_for
+from ..system import (
+    ElGamalCryptoSystem, ElGamalSignatureSystem, ElGamalCiphertext,
+    ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey, ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey,
+)
+
+# Chế độ dòng lệnh không tương tác:
+#   python -m crypto.run keygen  --public pub.json --private priv.json [--bits N] [--subgroup-bits N]
+#   python -m crypto.run encrypt --key pub.json  [-i in] [-o out] [--workers N]
+#   python -m crypto.run decrypt --key priv.json [-i in] [-o out] [--workers N]
+#   python -m crypto.run sign    --key priv.json [-i in] [-o sig]
+#   python -m crypto.run verify  --key pub.json  --signature sig [-i in]
+# Dữ liệu được đọc theo từng đoạn BATCH_BLOCKS block nên bộ nhớ không phụ thuộc kích thước file.
+# Định dạng ra: MAGIC (4 byte) + độ rộng W của p (2 byte) + các bản ghi hai số W byte big-endian
+# ((y1, y2) cho bản mã theo đúng thứ tự block; chữ ký là hash-then-sign: đúng một cặp (gamma, delta)).
+
+BATCH_BLOCKS = 256
+CIPHERTEXT_MAGIC = b"EGCT"
+SIGNATURE_MAGIC = b"EGSD"
+HASH_CHUNK = 1 << 20
+
+
+def _width(p: int) -> int:
+    return (p.bit_length() + 7) // 8
+
+
+def _load_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: int(v) for k, v in json.load(f).items() if v is not None}
+
+
+def load_public_key(path: str) -> ElGamalCryptoPublicKey:
+    d = _load_json(path)
+    return ElGamalCryptoPublicKey(d["p"], d["g"], d["beta"], d.get("q"))
+
+
+def load_private_key(path: str) -> ElGamalCryptoPrivateKey:
+    d = _load_json(path)
+    return ElGamalCryptoPrivateKey(d["p"], d["a"], d.get("q"))
+
+
+def load_signer_key(path: str) -> ElGamalSignatureSignerKey:
+    d = _load_json(path)
+    return ElGamalSignatureSignerKey(d["p"], d["g"], d["a"], d.get("q"))
+
+
+def load_verifier_key(path: str) -> ElGamalSignatureVerifierKey:
+    d = _load_json(path)
+    return ElGamalSignatureVerifierKey(d["p"], d["g"], d["beta"], d.get("q"))
+
+
+def _dump_json(path: str, values: dict, private: bool = False) -> None:
+    """private=True: file chỉ chủ sở hữu đọc/ghi được (0600), kể cả khi ghi đè file đã có."""
+    if private:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        f = os.fdopen(fd, "w", encoding="utf-8")
+    else:
+        f = open(path, "w", encoding="utf-8")
+    with f:
+        json.dump({k: str(v) for k, v in values.items() if v is not None}, f, indent=2)
+
+
+# === Đọc / ghi luồng ===
+
+def _read_chunks(stream: BinaryIO, size: int) -> Iterator[bytes]:
+    """Các đoạn đúng 'size' byte (trừ đoạn cuối), kể cả khi stream là pipe trả về ít hơn."""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        while len(chunk) < size:
+            more = stream.read(size - len(chunk))
+            if not more:
+                break
+            chunk += more
+        yield chunk
+
+
+def _write_header(out: BinaryIO, magic: bytes, width: int) -> None:
+    out.write(magic + struct.pack(">H", width))
+
+
+def _read_header(stream: BinaryIO, magic: bytes, width: int) -> None:
+    head = stream.read(6)
+    if len(head) != 6 or head[:4] != magic:
+        raise ValueError("không đúng định dạng (sai magic)")
+    if struct.unpack(">H", head[4:])[0] != width:
+        raise ValueError("độ rộng số trong file không khớp với khóa")
+
+
+def _pack_records(values: Iterable[int], width: int) -> bytes:
+    return b"".join(int(v).to_bytes(width, "big") for v in values)
+
+
+def _unpack_records(chunk: bytes, width: int) -> list[int]:
+    if len(chunk) % (2 * width):
+        raise ValueError("bản ghi bị cắt")
+    view = memoryview(chunk)
+    return [int.from_bytes(view[i:i + width], "big") for i in range(0, len(view), width)]
+
+
+def _batched(items: Iterable, n: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# === Các pipeline ===
+
+def encrypt_stream(system: ElGamalCryptoSystem, public_key: ElGamalCryptoPublicKey, chunks: Iterable[bytes], workers: int = 1) -> Iterator[bytes]:
+    """Đoạn bytes → block đóng gói → cặp (y1, y2) → bản ghi; workers > 1 mã hóa nhiều đoạn cùng lúc."""
+    width, block_size = _width(public_key.p), block_size_for(public_key.p)
+    for group in _batched(chunks, max(1, 4 * workers) if workers > 1 else 1):
+        plain_texts = [Plaintext.from_bytes(chunk, block_size) for chunk in group]
+        cipher_texts = system.encrypt_many(public_key, plain_texts, workers) if workers > 1 else [system.encrypt(public_key, plain_texts[0])]
+        for cipher_text in cipher_texts:
+            yield _pack_records((v for pair in zip(cipher_text.y1_values(), cipher_text.y2_values()) for v in pair), width)
+
+
+def decrypt_stream(system: ElGamalCryptoSystem, private_key: ElGamalCryptoPrivateKey, chunks: Iterable[bytes], workers: int = 1) -> Iterator[bytes]:
+    width = _width(private_key.p)
+    for group in _batched(chunks, max(1, 4 * workers) if workers > 1 else 1):
+        cipher_texts = []
+        for chunk in group:
+            values = _unpack_records(chunk, width)
+            cipher_texts.append(ElGamalCiphertext.from_values(values[0::2], values[1::2], width))
+        plain_texts = system.decrypt_many(private_key, cipher_texts, workers) if workers > 1 else [system.decrypt(private_key, cipher_texts[0])]
+        for plain_text in plain_texts:
+            yield plain_text.to_bytes()
+
+
+def sign_stream(system: ElGamalSignatureSystem, signer_key: ElGamalSignatureSignerKey, chunks: Iterable[bytes]) -> bytes:
+    """Băm luồng từng đoạn rồi ký một lần: trả về bản ghi (gamma, delta)."""
+    digest = system.new_digest()
+    for chunk in chunks:
+        digest.update(chunk)
+    return _pack_records(system.sign_digest(signer_key, digest).numbers, _width(signer_key.p))
+
+
+def verify_stream(system: ElGamalSignatureSystem, verifier_key: ElGamalSignatureVerifierKey, chunks: Iterable[bytes], signature: BinaryIO) -> bool:
+    width = _width(verifier_key.p)
+    try:
+        numbers = _unpack_records(signature.read(2 * width), width)
+    except ValueError:
+        return False
+    if len(numbers) != 2 or signature.read(1) != b"":
+        return False
+    digest = system.new_digest()
+    for chunk in chunks:
+        digest.update(chunk)
+    return system.verify_digest(verifier_key, digest, Plaintext(numbers))
+
+
+# === Dòng lệnh ===
+
+def _open_in(path: str):
+    return contextlib.nullcontext(sys.stdin.buffer) if path == "-" else open(path, "rb")
+
+
+def _open_out(path: str):
+    return contextlib.nullcontext(sys.stdout.buffer) if path == "-" else open(path, "wb")
+
+
+def _cmd_keygen(args) -> int:
+    system = ElGamalCryptoSystem(subgroup_bits=args.subgroup_bits)
+    public_key, private_key = system.generate_keypair(args.bits)
+    _dump_json(args.public, {"p": public_key.p, "g": public_key.g, "beta": public_key.beta, "q": public_key.q})
+    # khóa bí mật kèm g để dùng được cho cả giải mã lẫn ký
+    _dump_json(args.private, {"p": private_key.p, "g": public_key.g, "a": private_key.a, "q": private_key.q}, private=True)
+    return 0
+
+
+def _cmd_encrypt(args) -> int:
+    system = ElGamalCryptoSystem()
+    public_key = load_public_key(args.key)
+    with _open_in(args.input) as src, _open_out(args.output) as out:
+        try:
+            _write_header(out, CIPHERTEXT_MAGIC, _width(public_key.p))
+            chunks = _read_chunks(src, BATCH_BLOCKS * block_size_for(public_key.p))
+            for record in encrypt_stream(system, public_key, chunks, args.workers):
+                out.write(record)
+            out.flush()
+        finally:
+            system.close()
+    return 0
+
+
+def _cmd_decrypt(args) -> int:
+    system = ElGamalCryptoSystem()
+    private_key = load_private_key(args.key)
+    width = _width(private_key.p)
+    with _open_in(args.input) as src, _open_out(args.output) as out:
+        try:
+            _read_header(src, CIPHERTEXT_MAGIC, width)
+            for data in decrypt_stream(system, private_key, _read_chunks(src, BATCH_BLOCKS * 2 * width), args.workers):
+                out.write(data)
+            out.flush()
+        finally:
+            system.close()
+    return 0
+
+
+def _cmd_sign(args) -> int:
+    system = ElGamalSignatureSystem()
+    signer_key = load_signer_key(args.key)
+    with _open_in(args.input) as src, _open_out(args.output) as out:
+        record = sign_stream(system, signer_key, _read_chunks(src, HASH_CHUNK))
+        _write_header(out, SIGNATURE_MAGIC, _width(signer_key.p))
+        out.write(record)
+        out.flush()
+    return 0
+
+
+def _cmd_verify(args) -> int:
+    system = ElGamalSignatureSystem()
+    verifier_key = load_verifier_key(args.key)
+    with _open_in(args.input) as src, open(args.signature, "rb") as signature:
+        _read_header(signature, SIGNATURE_MAGIC, _width(verifier_key.p))
+        ok = verify_stream(system, verifier_key, _read_chunks(src, HASH_CHUNK), signature)
+    print("OK" if ok else "FAILED", file=sys.stderr)
+    return 0 if ok else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m crypto.run", description="ElGamal encrypt/decrypt/sign/verify cho file hoặc stdin/stdout")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("keygen", help="sinh cặp khóa (JSON)")
+    p.add_argument("--public", required=True)
+    p.add_argument("--private", required=True)
+    p.add_argument("--bits", type=int, default=2048)
+    p.add_argument("--subgroup-bits", type=int, default=None)
+    p.set_defaults(func=_cmd_keygen)
+
+    for name, func, help_text in (("encrypt", _cmd_encrypt, "mã hóa bằng khóa công khai"),
+                                  ("decrypt", _cmd_decrypt, "giải mã bằng khóa bí mật")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--key", required=True)
+        p.add_argument("-i", "--input", default="-")
+        p.add_argument("-o", "--output", default="-")
+        p.add_argument("--workers", type=int, default=1, help="số tiến trình (1 = tuần tự)")
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("sign", help="ký bằng khóa bí mật")
+    p.add_argument("--key", required=True)
+    p.add_argument("-i", "--input", default="-")
+    p.add_argument("-o", "--output", default="-")
+    p.set_defaults(func=_cmd_sign)
+
+    p = sub.add_parser("verify", help="xác thực chữ ký bằng khóa công khai")
+    p.add_argument("--key", required=True)
+    p.add_argument("--signature", required=True)
+    p.add_argument("-i", "--input", default="-")
+    p.set_defaults(func=_cmd_verify)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except KeyError as e:
+        print(f"error: file khóa thiếu trường {e}", file=sys.stderr)
+        return 2
+    except (ValueError, TypeError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
@@ -5,7 +5,6 @@ setup(
     packages=find_packages(),
     install_requires=[
         "gmpy2",
-        "sympy",
         "secrets",
         "multiprocessing",
         "typing",
@@ -1,12 +1,33 @@
-from ..pubkey import CryptoSystem, Plaintext, CryptoSystemTest
-from ..prime.generate_prime import generate_prime
-from ..prime.prime_root import find_primitive_root
+from ..pubkey import CryptoSystem, Plaintext, CryptoSystemTest, block_size_for, detect_block_size
+from ..prime.generate_prime import PrimeGenerator, get_prime_generator, generate_schnorr_prime
+from ..prime.prime_root import find_primitive_root, find_subgroup_generator
+from ..prime.parameter_pool import ParameterPool
+from ..arith.fixed_base import FixedBaseTable, DEFAULT_MEMORY_BUDGET
+from ..arith.precompute import PrecomputePool, DEFAULT_CAPACITY, DEFAULT_LOW_WATERMARK
+from .HybridElgamal import ElGamalHybridCiphertext, FRAME_SIZE, hybrid_encrypt, hybrid_decrypt
+import gmpy2
+import hashlib
+import multiprocessing as mp
+import os
 import random
+import secrets
 import unittest
+from typing import Iterable
 
 CRYPTO_BITS  = 2048
+SUBGROUP_BITS = 256  # kích thước q thường dùng cho chế độ nhóm con Schnorr (224 hoặc 256)
+PARALLEL_THRESHOLD = 64  # encrypt_many/decrypt_many: ít block hơn thì chạy tuần tự
+
+def _pack_ints(values, width: int) -> bytes:
+    return b"".join(int(v).to_bytes(width, "big") for v in values)
+
+def _unpack_ints(blob, width: int) -> list:
+    view = memoryview(blob)
+    return [gmpy2.mpz(int.from_bytes(view[i:i + width], "big")) for i in range(0, len(view), width)]
 
 class ElGamalCiphertextPair:
+    __slots__ = ("y1", "y2")
+    
     def __init__(self, y1: int, y2: int):
         self.y1 = y1
         self.y2 = y2
@@ -14,16 +35,138 @@ class ElGamalCiphertextPair:
     def __repr__(self):
         return f"ElGamalCiphertextPair(y1={self.y1}, y2={self.y2})"
     
+class _CipherPairsView:
+    """Dãy ElGamalCiphertextPair chỉ đọc, tạo từng cặp khi truy cập (tương thích list cũ khi duyệt/đánh chỉ số)."""
+    __slots__ = ("_cipher_text",)
+    
+    def __init__(self, cipher_text: "ElGamalCiphertext"):
+        self._cipher_text = cipher_text
+    
+    def __len__(self) -> int:
+        return len(self._cipher_text)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._cipher_text[index].cipher_pairs)
+        return self._cipher_text.pair(index)
+    
+    def __iter__(self):
+        for y1, y2 in zip(self._cipher_text.y1_values(), self._cipher_text.y2_values()):
+            yield ElGamalCiphertextPair(y1, y2)
+    
+    def __eq__(self, other) -> bool:
+        return [(c.y1, c.y2) for c in self] == [(c.y1, c.y2) for c in other]
+    
+    def __repr__(self) -> str:
+        return repr(list(self))
+    
 class ElGamalCiphertext:
-    def __init__(self, cipher_pairs: list[ElGamalCiphertextPair]):
-        self.cipher_pairs = cipher_pairs
+    """
+    Bản mã lưu gọn: mọi y1 nằm liền trong một bộ đệm bytes, mọi y2 trong bộ đệm thứ hai,
+    mỗi số chiếm đúng 'width' byte big-endian (thường là độ dài của p).
+    cipher_pairs là view lười; y1_values()/y2_values() chuyển cả lô sang mpz.
+    """
+    __slots__ = ("width", "_y1s", "_y2s")
+    
+    def __init__(self, cipher_pairs: Iterable[ElGamalCiphertextPair]):
+        pairs = list(cipher_pairs)
+        self._init_values([c.y1 for c in pairs], [c.y2 for c in pairs], None)
+        
+    def _init_values(self, y1s: list, y2s: list, width: int|None) -> None:
+        if len(y1s) != len(y2s):
+            raise ValueError("số y1 và y2 khác nhau")
+        if width is None:
+            width = max(1, max(((int(v).bit_length() + 7) // 8 for v in (*y1s, *y2s)), default=1))
+        self.width = width
+        self._y1s = _pack_ints(y1s, width)
+        self._y2s = _pack_ints(y2s, width)
+    
+    @staticmethod
+    def from_values(y1s: Iterable[int], y2s: Iterable[int], width: int|None = None) -> "ElGamalCiphertext":
+        """Dựng từ hai dãy số (int hoặc mpz); width=None → độ dài của số lớn nhất."""
+        cipher_text = ElGamalCiphertext.__new__(ElGamalCiphertext)
+        cipher_text._init_values(list(y1s), list(y2s), width)
+        return cipher_text
+    
+    @staticmethod
+    def from_buffers(y1s: bytes, y2s: bytes, width: int) -> "ElGamalCiphertext":
+        """Dựng thẳng từ hai bộ đệm số độ rộng cố định (không chuyển đổi qua int)."""
+        if len(y1s) != len(y2s) or len(y1s) % width:
+            raise ValueError("bộ đệm bản mã không hợp lệ")
+        cipher_text = ElGamalCiphertext.__new__(ElGamalCiphertext)
+        cipher_text.width = width
+        cipher_text._y1s = bytes(y1s)
+        cipher_text._y2s = bytes(y2s)
+        return cipher_text
+    
+    def buffers(self, width: int|None = None) -> tuple[bytes, bytes]:
+        """Hai bộ đệm (y1, y2) ở độ rộng 'width' (mặc định là độ rộng đang lưu)."""
+        if width is None or width == self.width:
+            return self._y1s, self._y2s
+        return _pack_ints(self.y1_values(), width), _pack_ints(self.y2_values(), width)
+    
+    @property
+    def cipher_pairs(self) -> _CipherPairsView:
+        return _CipherPairsView(self)
+    
+    def __len__(self) -> int:
+        return len(self._y1s) // self.width
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return ElGamalCiphertext.from_values(
+                    self.y1_values()[index], self.y2_values()[index], self.width)
+            w = self.width
+            return ElGamalCiphertext.from_buffers(self._y1s[start * w:stop * w], self._y2s[start * w:stop * w], w)
+        return self.pair(index)
+    
+    def pair(self, index: int) -> ElGamalCiphertextPair:
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("chỉ số cặp bản mã ngoài phạm vi")
+        w = self.width
+        return ElGamalCiphertextPair(
+            gmpy2.mpz(int.from_bytes(self._y1s[index * w:(index + 1) * w], "big")),
+            gmpy2.mpz(int.from_bytes(self._y2s[index * w:(index + 1) * w], "big")),
+        )
+    
+    def y1_values(self) -> list:
+        return _unpack_ints(self._y1s, self.width)
+    
+    def y2_values(self) -> list:
+        return _unpack_ints(self._y2s, self.width)
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self._y1s) + len(self._y2s)
         
     def __repr__(self):
         return f"ElGamalCiphertext(cipher_pairs={self.cipher_pairs})"
     
-def ElGamal_generate_keys(bit_length: int) -> tuple[dict, dict]:
-    p = generate_prime(bit_length, safe=True)
-    g = find_primitive_root(p, safe=True)
+def ElGamal_generate_keys(
+    bit_length: int,
+    prime_generator: PrimeGenerator|None = None,
+    parameter_pool: ParameterPool|None = None,
+    subgroup_bits: int|None = None,
+) -> tuple[dict, dict]:
+    if subgroup_bits:
+        # Nhóm con Schnorr: p = r·q + 1, g sinh nhóm con cấp q, a lấy mod q
+        p, q = generate_schnorr_prime(bit_length, subgroup_bits)
+        g = find_subgroup_generator(p, q)
+        a = secrets.randbelow(q - 1) + 1
+        beta = pow(g, a, p)
+        return {"p": p, "g": g, "beta": beta, "q": q}, {"p": p, "a": a, "q": q}
+
+    if parameter_pool is not None:
+        # (p, g) sinh sẵn → chỉ còn một phép lũy thừa cho beta
+        p, g = parameter_pool.get(bit_length)
+    else:
+        p = (prime_generator or get_prime_generator()).generate(bit_length, safe=True)
+        g = find_primitive_root(p, safe=True)
     
     a = random.randint(2, p - 2)  # Private key
     beta = pow(g, a, p)  # Public key component
@@ -33,26 +176,256 @@ def ElGamal_generate_keys(bit_length: int) -> tuple[dict, dict]:
     
     return public_key, private_key
 
+def _subgroup_mask(s: int, p: int) -> int:
+    """
+    Mặt nạ cộng cho chế độ nhóm con: SHA-256 ở chế độ đếm trên s, dài hơn p 16 byte rồi lấy mod p.
+    Bản rõ không nằm trong nhóm con cấp q nên không thể nhân trực tiếp với beta^k
+    (m^q sẽ làm lộ m); y2 = m + H(beta^k) mod p là ElGamal dạng băm.
+    """
+    size = (p.bit_length() + 7) // 8
+    seed = int(s).to_bytes(size, "big")
+    out = b"".join(hashlib.sha256(i.to_bytes(4, "big") + seed).digest() for i in range((size + 16 + 31) // 32))
+    return int.from_bytes(out[:size + 16], "big") % p
+
 class ElGamalCryptoPublicKey:
-    def __init__(self, p: int, g: int, beta: int):
+    def __init__(self, p: int, g: int, beta: int, q: int|None = None):
         self.p = p
         self.g = g
         self.beta = beta
+        self.q = q  # cấp nhóm con (chế độ Schnorr); None → g là primitive root mod safe prime p
+        # bảng lũy thừa cơ số cố định, chỉ có sau precompute()
+        self.g_table: FixedBaseTable|None = None
+        self.beta_table: FixedBaseTable|None = None
+        # kho (g^k, beta^k) tính sẵn, chỉ có sau start_randomness_pool()
+        self.randomness_pool: PrecomputePool|None = None
+    
+    def precompute(self, memory_budget: int = 2 * DEFAULT_MEMORY_BUDGET) -> "ElGamalCryptoPublicKey":
+        """Dựng bảng cơ số cố định cho g và beta (chia đôi memory_budget); encrypt dùng tự động."""
+        exponent_bits = (self.q or self.p).bit_length()
+        self.g_table = FixedBaseTable(self.g, self.p, exponent_bits, memory_budget // 2)
+        self.beta_table = FixedBaseTable(self.beta, self.p, exponent_bits, memory_budget // 2)
+        return self
+    
+    def pow_g(self, k: int):
+        return self.g_table.pow(k) if self.g_table else gmpy2.powmod(self.g, k, self.p)
+    
+    def pow_beta(self, k: int):
+        return self.beta_table.pow(k) if self.beta_table else gmpy2.powmod(self.beta, k, self.p)
+    
+    def random_exponent(self) -> int:
+        """Nonce k mới: k mod q ở chế độ nhóm con, k trong [2, p-2] với safe prime."""
+        if self.q:
+            return secrets.randbelow(self.q - 1) + 1
+        return secrets.randbelow(self.p - 3) + 2
+    
+    def random_pair(self) -> tuple:
+        """(g^k, beta^k) với nonce k mới."""
+        k = self.random_exponent()
+        return self.pow_g(k), self.pow_beta(k)
+    
+    def start_randomness_pool(self, capacity: int = DEFAULT_CAPACITY, low_watermark: int = DEFAULT_LOW_WATERMARK) -> PrecomputePool:
+        """
+        Bật chế độ offline/online: luồng nền giữ sẵn tối đa 'capacity' cặp (g^k, beta^k),
+        encrypt chỉ còn một phép nhân (hoặc một lần băm) cho mỗi block khi kho còn hàng.
+        """
+        if self.randomness_pool is None:
+            self.randomness_pool = PrecomputePool(self.random_pair, capacity, low_watermark, name="elgamal-randomness-pool")
+        return self.randomness_pool
+    
+    def stop_randomness_pool(self) -> None:
+        if self.randomness_pool is not None:
+            self.randomness_pool.close()
+            self.randomness_pool = None
     
     def __repr__(self) -> str:
+        if self.q:
+            return f"ElGamalCryptoPublicKey(p={self.p}, g={self.g}, beta={self.beta}, q={self.q})"
         return f"ElGamalCryptoPublicKey(p={self.p}, g={self.g}, beta={self.beta})"
     
 class ElGamalCryptoPrivateKey:
-    def __init__(self, p: int, a: int):
+    def __init__(self, p: int, a: int, q: int|None = None):
         self.p = p
         self.a = a
+        self.q = q
     
     def __repr__(self) -> str:
+        if self.q:
+            return f"ElGamalCryptoPrivateKey(p={self.p}, a={self.a}, q={self.q})"
         return f"ElGamalCryptoPrivateKey(p={self.p}, a={self.a})"
     
+class ElGamalMultiCiphertext:
+    """
+    Bản mã cho nhiều người nhận cùng nhóm (p, g): một y1 = g^k chung cho mỗi block,
+    mỗi người nhận i có riêng dãy y2 (tính từ beta_i^k). Lưu gọn như ElGamalCiphertext.
+    """
+    __slots__ = ("width", "_y1s", "_y2s")
+    
+    def __init__(self, y1s: bytes, y2s: list[bytes], width: int):
+        if any(len(b) != len(y1s) for b in y2s) or len(y1s) % width:
+            raise ValueError("bộ đệm bản mã không hợp lệ")
+        self.width = width
+        self._y1s = y1s
+        self._y2s = y2s
+    
+    def __len__(self) -> int:
+        return len(self._y1s) // self.width
+    
+    @property
+    def recipients(self) -> int:
+        return len(self._y2s)
+    
+    def for_recipient(self, index: int) -> ElGamalCiphertext:
+        """Bản mã thường của người nhận thứ 'index' (dùng chung bộ đệm y1, giải mã bằng decrypt)."""
+        return ElGamalCiphertext.from_buffers(self._y1s, self._y2s[index], self.width)
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self._y1s) * (1 + len(self._y2s))
+    
+    def __repr__(self) -> str:
+        return f"ElGamalMultiCiphertext(blocks={len(self)}, recipients={self.recipients})"
+    
+def _encrypt_numbers(public_key: ElGamalCryptoPublicKey, numbers) -> list[tuple]:
+    """Mã hóa từng block, trả về list (y1, y2); lấy (g^k, beta^k) từ kho tính sẵn nếu có."""
+    p, q = public_key.p, public_key.q
+    pool = public_key.randomness_pool
+    pairs = []
+    for m in numbers:
+        item = pool.take() if pool is not None else None
+        y1, s = item if item is not None else public_key.random_pair()
+        if q:
+            # nonce ngắn mod q, bản rõ che bằng mặt nạ băm
+            y2 = (m + _subgroup_mask(s, p)) % p
+        else:
+            y2 = (m * s) % p
+        pairs.append((y1, y2))
+    return pairs
+
+def _batch_invert(values: list, p) -> list:
+    """
+    Nghịch đảo mod p của cả danh sách bằng mẹo Montgomery:
+    một phép invert cho tích, cộng ~3(n-1) phép nhân.
+    """
+    prefix = []
+    acc = gmpy2.mpz(1)
+    for v in values:
+        acc = acc * v % p
+        prefix.append(acc)
+    if not prefix:
+        return []
+    if gmpy2.gcd(acc, p) != 1:
+        raise ValueError("y1 không khả nghịch mod p")
+    inv = gmpy2.invert(acc, p)
+    out = [None] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        out[i] = inv * prefix[i - 1] % p
+        inv = inv * values[i] % p
+    out[0] = inv
+    return out
+
+def _decrypt_numbers(private_key: ElGamalCryptoPrivateKey, pairs, batch_inverse: bool = False) -> list:
+    """
+    Giải mã list (y1, y2) về list số của bản rõ, toàn bộ trên mpz.
+    Safe prime: s^-1 = y1^(p-1-a) trực tiếp (một phép lũy thừa thay vì hai),
+    hoặc batch_inverse=True: tính mọi s = y1^a rồi nghịch đảo cả lô bằng _batch_invert.
+    """
+    p, a = gmpy2.mpz(private_key.p), gmpy2.mpz(private_key.a)
+    pairs = [(gmpy2.mpz(y1), gmpy2.mpz(y2)) for y1, y2 in pairs]
+    if private_key.q:
+        # y1 phải thuộc nhóm con cấp q: y1 cấp nhỏ f (p - 1 = r·q, r có ước nhỏ) sẽ làm lộ a mod f qua bản rõ trả về
+        q = gmpy2.mpz(private_key.q)
+        for y1, _ in pairs:
+            if not (1 < y1 < p and gmpy2.powmod(y1, q, p) == 1):
+                raise ValueError("y1 không thuộc nhóm con cấp q")
+        # ElGamal dạng băm cần chính s, không cần nghịch đảo
+        return [(y2 - _subgroup_mask(gmpy2.powmod(y1, a, p), p)) % p for y1, y2 in pairs]
+    if batch_inverse:
+        inverses = _batch_invert([gmpy2.powmod(y1, a, p) for y1, _ in pairs], p)
+    else:
+        e = p - 1 - a
+        inverses = [gmpy2.powmod(y1, e, p) for y1, _ in pairs]
+    return [y2 * s_inv % p for (_, y2), s_inv in zip(pairs, inverses)]
+
+# === Chạy song song: số nguyên được gửi sang worker dưới dạng một khối bytes độ rộng cố định ===
+
+_worker_public_keys: dict = {}
+
+def _worker_public_key(params: tuple) -> ElGamalCryptoPublicKey:
+    """Khóa công khai trong tiến trình con, dựng bảng cơ số cố định một lần cho mỗi khóa."""
+    key = _worker_public_keys.get(params)
+    if key is None:
+        p, g, beta, q, tables = params
+        key = ElGamalCryptoPublicKey(p, g, beta, q)
+        if tables:
+            key.precompute()
+        if len(_worker_public_keys) >= 8:
+            _worker_public_keys.clear()
+        _worker_public_keys[params] = key
+    return key
+
+def _public_key_params(public_key: ElGamalCryptoPublicKey) -> tuple:
+    """Tham số gửi sang worker (khóa được dựng lại và lưu cache ở đó)."""
+    return (int(public_key.p), int(public_key.g), int(public_key.beta),
+            int(public_key.q) if public_key.q else None, public_key.g_table is not None)
+
+def _rerandomize_numbers(public_key: ElGamalCryptoPublicKey, pairs) -> list[tuple]:
+    """(y1·g^r, y2·beta^r) cho từng cặp; (g^r, beta^r) lấy từ kho tính sẵn nếu có."""
+    p = public_key.p
+    pool = public_key.randomness_pool
+    out = []
+    for y1, y2 in pairs:
+        item = pool.take() if pool is not None else None
+        u, v = item if item is not None else public_key.random_pair()
+        out.append((y1 * u % p, y2 * v % p))
+    return out
+
+def _rerandomize_task(args: tuple) -> tuple[bytes, bytes]:
+    params, width, blob1, blob2 = args
+    pairs = _rerandomize_numbers(_worker_public_key(params), zip(_unpack_ints(blob1, width), _unpack_ints(blob2, width)))
+    return _pack_ints((y1 for y1, _ in pairs), width), _pack_ints((y2 for _, y2 in pairs), width)
+
+def _encrypt_task(args: tuple) -> tuple[bytes, bytes]:
+    params, width, blob = args
+    pairs = _encrypt_numbers(_worker_public_key(params), _unpack_ints(blob, width))
+    return _pack_ints((y1 for y1, _ in pairs), width), _pack_ints((y2 for _, y2 in pairs), width)
+
+def _decrypt_task(args: tuple) -> bytes:
+    (p, a, q), width, blob1, blob2 = args
+    pairs = zip(_unpack_ints(blob1, width), _unpack_ints(blob2, width))
+    return _pack_ints(_decrypt_numbers(ElGamalCryptoPrivateKey(p, a, q), pairs), width)
+
+def _chunk_size(total: int, workers: int) -> int:
+    """Số block mỗi task: khoảng 4 task cho mỗi worker, không quá nhỏ."""
+    return max(PARALLEL_THRESHOLD // 4, -(-total // (4 * workers)))
+
+def _split_by_counts(values: list, counts: list[int]) -> list[list]:
+    out, i = [], 0
+    for n in counts:
+        out.append(values[i:i + n])
+        i += n
+    return out
+
 class ElGamalCryptoSystem(CryptoSystem[ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey, ElGamalCiphertext]):
+    def __init__(
+        self,
+        prime_generator: PrimeGenerator|None = None,
+        parameter_pool: ParameterPool|None = None,
+        subgroup_bits: int|None = None,
+    ):
+        # None → dùng PrimeGenerator mặc định (pool tiến trình dùng chung)
+        self.prime_generator = prime_generator
+        # Kho (p, g) sinh sẵn; None → sinh đồng bộ mỗi lần
+        self.parameter_pool = parameter_pool
+        # Số bit của q cho chế độ nhóm con Schnorr; None → safe prime như cũ
+        self.subgroup_bits = subgroup_bits
+        # pool tiến trình cho encrypt_many/decrypt_many, tạo khi cần
+        self._pool = None
+        self._pool_size = 0
+
     def generate_keypair(self, bits: int = CRYPTO_BITS):
-        public_key_dict, private_key_dict = ElGamal_generate_keys(bits)
+        public_key_dict, private_key_dict = ElGamal_generate_keys(
+            bits, self.prime_generator, self.parameter_pool, self.subgroup_bits
+        )
         public_key = ElGamalCryptoPublicKey(**public_key_dict)
         private_key = ElGamalCryptoPrivateKey(**private_key_dict)
         return public_key, private_key
@@ -62,11 +435,12 @@ class ElGamalCryptoSystem(CryptoSystem[ElGamalCryptoPublicKey, ElGamalCryptoPriv
         p = int(input("Enter prime p: "))
         g = int(input("Enter primitive root g: "))
         beta = int(input("Enter beta: "))
-        return ElGamalCryptoPublicKey(p, g, beta)
+        q = input("Enter subgroup order q (empty for safe prime): ").strip()
+        return ElGamalCryptoPublicKey(p, g, beta, int(q) if q else None)
     
     def ask_plain_text_interactively(self, public_key: ElGamalCryptoPublicKey, prompt: str|None = None) -> Plaintext:
         s = input((prompt or "Enter plaintext") + " (as string): ")
-        return Plaintext.from_string(s)
+        return self.str2plaintext(public_key, s)
     
     def ask_cipher_text_interactively(self, private_key: ElGamalCryptoPrivateKey, prompt: str|None = None) -> ElGamalCiphertext:
         print(prompt or "Enter ElGamal Ciphertext pairs:")
@@ -79,39 +453,281 @@ class ElGamalCryptoSystem(CryptoSystem[ElGamalCryptoPublicKey, ElGamalCryptoPriv
         return ElGamalCiphertext(cipher_pairs)
     
     def encrypt(self, public_key: ElGamalCryptoPublicKey, plain_text: Plaintext) -> ElGamalCiphertext:
-        p, g, beta = public_key.p, public_key.g, public_key.beta
-        cipher_pairs: list[ElGamalCiphertextPair] = []
-        
+        pairs = _encrypt_numbers(public_key, plain_text.numbers)
+        width = (public_key.p.bit_length() + 7) // 8
+        return ElGamalCiphertext.from_values((y1 for y1, _ in pairs), (y2 for _, y2 in pairs), width)
+    
+    def decrypt(self, private_key: ElGamalCryptoPrivateKey, cipher_text: ElGamalCiphertext, batch_inverse: bool = False) -> Plaintext:
+        pairs = zip(cipher_text.y1_values(), cipher_text.y2_values())
+        numbers = _decrypt_numbers(private_key, pairs, batch_inverse)
+        return Plaintext(numbers, detect_block_size(numbers, private_key.p))
+    
+    def encrypt_multi(self, public_keys: list[ElGamalCryptoPublicKey], plain_text: Plaintext) -> ElGamalMultiCiphertext:
+        """
+        Mã hóa cùng một bản rõ cho nhiều người nhận chung (p, g, q): dùng lại một k và y1 = g^k
+        cho mỗi block, chỉ tính beta_i^k cho từng người nhận (tái dùng ngẫu nhiên kiểu
+        Kurosawa / Bellare–Boldyreva–Staddon, an toàn khi các beta_i khác nhau và độc lập).
+        Bảng cơ số cố định của từng khóa được dùng nếu đã precompute().
+        """
+        if not public_keys:
+            raise ValueError("cần ít nhất một khóa công khai")
+        first = public_keys[0]
+        if any((key.p, key.g, key.q) != (first.p, first.g, first.q) for key in public_keys):
+            raise ValueError("mọi người nhận phải dùng chung nhóm (p, g, q)")
+        p, q = first.p, first.q
+        y1s: list = []
+        y2s: list[list] = [[] for _ in public_keys]
         for m in plain_text.numbers:
-            k = random.randint(2, p - 2)
-            y1 = pow(g, k, p)
-            y2 = (m * pow(beta, k, p)) % p
-            cipher_pairs.append(ElGamalCiphertextPair(y1, y2))
-        
-        return ElGamalCiphertext(cipher_pairs)
+            k = first.random_exponent()
+            y1s.append(first.pow_g(k))
+            for key, out in zip(public_keys, y2s):
+                s = key.pow_beta(k)
+                out.append((m + _subgroup_mask(s, p)) % p if q else m * s % p)
+        width = (p.bit_length() + 7) // 8
+        return ElGamalMultiCiphertext(_pack_ints(y1s, width), [_pack_ints(out, width) for out in y2s], width)
     
-    def decrypt(self, private_key: ElGamalCryptoPrivateKey, cipher_text: ElGamalCiphertext) -> Plaintext:
-        p, a = private_key.p, private_key.a
-        numbers: list[int] = []
-        
-        for pair in cipher_text.cipher_pairs:
-            y1, y2 = pair.y1, pair.y2
-            s = pow(y1, a, p)
-            s_inv = pow(s, p - 2, p)  # Modular inverse using Fermat's little theorem
-            m = (y2 * s_inv) % p
-            numbers.append(m)
-        
-        return Plaintext(numbers)
+    def encrypt_hybrid(self, public_key: ElGamalCryptoPublicKey, data: bytes|str, frame_size: int = FRAME_SIZE) -> ElGamalHybridCiphertext:
+        """
+        Chế độ lai KEM/DEM cho payload lớn: một phép ElGamal cho khóa phiên,
+        payload mã hóa đối xứng có xác thực theo frame (xem HybridElgamal).
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return hybrid_encrypt(public_key, data, frame_size)
+    
+    def decrypt_hybrid(self, private_key: ElGamalCryptoPrivateKey, cipher_text: ElGamalHybridCiphertext) -> bytes:
+        """Giải mã bản mã lai; frame bị sửa hoặc bản mã bị cắt → ValueError."""
+        return hybrid_decrypt(private_key, cipher_text)
+    
+    def _get_pool(self, workers: int):
+        if self._pool is None or self._pool_size < workers:
+            self.close()
+            self._pool = mp.Pool(workers)
+            self._pool_size = workers
+        return self._pool
+    
+    def close(self) -> None:
+        """Dừng pool tiến trình của encrypt_many/decrypt_many (nếu có)."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_size = 0
+    
+    def encrypt_many(self, public_key: ElGamalCryptoPublicKey, plain_texts: list[Plaintext], workers: int|None = None) -> list[ElGamalCiphertext]:
+        """
+        Mã hóa nhiều bản rõ, chia đều mọi block (của mọi bản rõ) cho pool tiến trình.
+        Kết quả giữ đúng thứ tự; ít hơn PARALLEL_THRESHOLD block thì chạy tuần tự.
+        """
+        counts = [len(pt.numbers) for pt in plain_texts]
+        numbers = [m for pt in plain_texts for m in pt.numbers]
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(numbers) < PARALLEL_THRESHOLD:
+            return [self.encrypt(public_key, pt) for pt in plain_texts]
+
+        width = (public_key.p.bit_length() + 7) // 8
+        params = _public_key_params(public_key)
+        size = _chunk_size(len(numbers), workers)
+        tasks = [(params, width, _pack_ints(numbers[i:i + size], width)) for i in range(0, len(numbers), size)]
+        # kết quả của worker đã là bộ đệm độ rộng cố định → ghép và cắt thẳng, không qua int
+        y1s, y2s = bytearray(), bytearray()
+        for blob1, blob2 in self._get_pool(workers).imap(_encrypt_task, tasks):
+            y1s += blob1
+            y2s += blob2
+        out, offset = [], 0
+        for n in counts:
+            end = offset + n * width
+            out.append(ElGamalCiphertext.from_buffers(y1s[offset:end], y2s[offset:end], width))
+            offset = end
+        return out
+    
+    def decrypt_many(self, private_key: ElGamalCryptoPrivateKey, cipher_texts: list[ElGamalCiphertext], workers: int|None = None) -> list[Plaintext]:
+        """Giải mã nhiều bản mã song song (cùng cách chia block như encrypt_many)."""
+        counts = [len(ct) for ct in cipher_texts]
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or sum(counts) < PARALLEL_THRESHOLD:
+            return [self.decrypt(private_key, ct) for ct in cipher_texts]
+
+        width = (private_key.p.bit_length() + 7) // 8
+        params = (int(private_key.p), int(private_key.a), int(private_key.q) if private_key.q else None)
+        # bộ đệm của các bản mã được nối rồi cắt theo khối block, gửi thẳng sang worker
+        buffers = [ct.buffers(width) for ct in cipher_texts]
+        y1s = b"".join(b1 for b1, _ in buffers)
+        y2s = b"".join(b2 for _, b2 in buffers)
+        step = _chunk_size(sum(counts), workers) * width
+        tasks = [(params, width, y1s[i:i + step], y2s[i:i + step]) for i in range(0, len(y1s), step)]
+        numbers: list = []
+        for blob in self._get_pool(workers).imap(_decrypt_task, tasks):
+            numbers.extend(_unpack_ints(blob, width))
+        return [Plaintext(chunk, detect_block_size(chunk, private_key.p)) for chunk in _split_by_counts(numbers, counts)]
+    
+    def rerandomize_many(
+        self,
+        public_key: ElGamalCryptoPublicKey,
+        cipher_texts: list[ElGamalCiphertext],
+        shuffle: bool = False,
+        workers: int|None = None,
+        return_permutation: bool = False,
+    ):
+        """
+        Tái ngẫu nhiên hóa cả lô bản mã: mỗi cặp nhân với một bản mã mới của 1, (g^r, beta^r).
+        - (g^r, beta^r) lấy từ kho tính sẵn của khóa, hoặc tính bằng bảng cơ số cố định nếu có
+        - nhiều block thì chia cho pool tiến trình, gửi theo từng cửa sổ 4·workers task
+          nên bộ nhớ chỉ cỡ dữ liệu vào + ra, không phụ thuộc hàng đợi
+        - shuffle=True: hoán vị ngẫu nhiên (secrets) thứ tự các bản mã như một bước trộn mixnet;
+          return_permutation=True trả thêm perm với kết quả[i] = bản mã vào[perm[i]]
+        Chỉ áp dụng cho chế độ safe prime: bản mã nhóm con là ElGamal dạng băm, không nhân được.
+        """
+        if public_key.q:
+            raise ValueError("bản mã chế độ nhóm con (ElGamal dạng băm) không tái ngẫu nhiên hóa được")
+        permutation = list(range(len(cipher_texts)))
+        if shuffle:
+            random.SystemRandom().shuffle(permutation)
+        cipher_texts = [cipher_texts[i] for i in permutation]
+
+        counts = [len(ct) for ct in cipher_texts]
+        width = (public_key.p.bit_length() + 7) // 8
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or sum(counts) < PARALLEL_THRESHOLD:
+            out = []
+            for ct in cipher_texts:
+                pairs = _rerandomize_numbers(public_key, zip(ct.y1_values(), ct.y2_values()))
+                out.append(ElGamalCiphertext.from_values((y1 for y1, _ in pairs), (y2 for _, y2 in pairs), width))
+        else:
+            params = _public_key_params(public_key)
+            buffers = [ct.buffers(width) for ct in cipher_texts]
+            y1s = b"".join(b1 for b1, _ in buffers)
+            y2s = b"".join(b2 for _, b2 in buffers)
+            del buffers
+            step = _chunk_size(sum(counts), workers) * width
+            window = 4 * workers * step
+            pool = self._get_pool(workers)
+            out1, out2 = bytearray(), bytearray()
+            for start in range(0, len(y1s), window):
+                tasks = [(params, width, y1s[i:i + step], y2s[i:i + step])
+                         for i in range(start, min(start + window, len(y1s)), step)]
+                for blob1, blob2 in pool.imap(_rerandomize_task, tasks):
+                    out1 += blob1
+                    out2 += blob2
+            out, offset = [], 0
+            for n in counts:
+                end = offset + n * width
+                out.append(ElGamalCiphertext.from_buffers(out1[offset:end], out2[offset:end], width))
+                offset = end
+        if return_permutation:
+            return out, permutation
+        return out
     
     def str2plaintext(self, public_key: ElGamalCryptoPublicKey, string: str) -> Plaintext:
-        return Plaintext.from_string(string)
+        # block vừa kích thước khóa: ~p/8 byte mỗi block thay vì 15 ký tự
+        return Plaintext.from_string(string, block_size_for(public_key.p))
     
     def plaintext2str(self, private_key: ElGamalCryptoPrivateKey, plain_text: Plaintext) -> str:
+        if plain_text.block_size is None:
+            # bản rõ cũ (không có marker) giữ block_size None → giải mã theo chunk ký tự như trước
+            plain_text = Plaintext(plain_text.numbers, detect_block_size(plain_text.numbers, private_key.p))
         return plain_text.to_string()
     
 class ElGamalCryptoSystemTest(CryptoSystemTest[ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey, ElGamalCiphertext]):
     def create_crypto_system(self) -> ElGamalCryptoSystem:
         return ElGamalCryptoSystem()
     
+    def test_rerandomize_many(self):
+        K1, K2 = self.crypto_system.generate_keypair(512)
+        xs = ["DZ" * 20 * i for i in range(1, 40)]
+        cipher_texts = [self.crypto_system.encrypt(K1, self.crypto_system.str2plaintext(K1, x)) for x in xs]
+        # đủ nhiều block để workers=2 thật sự đi qua pool tiến trình
+        self.assertGreater(sum(len(c) for c in cipher_texts), 4 * PARALLEL_THRESHOLD)
+        try:
+            for workers in (1, 2):
+                shuffled, permutation = self.crypto_system.rerandomize_many(K1, cipher_texts, shuffle=True, workers=workers, return_permutation=True)
+                self.assertEqual(self.crypto_system._pool is not None, workers > 1)
+                for original, c in zip((cipher_texts[i] for i in permutation), shuffled):
+                    self.assertNotEqual(original.y1_values(), c.y1_values())
+                decrypted = [self.crypto_system.plaintext2str(K2, self.crypto_system.decrypt(K2, c)) for c in shuffled]
+                self.assertEqual(decrypted, [xs[i] for i in permutation])
+        finally:
+            self.crypto_system.close()
+
+    def test_decrypt_legacy_ciphertext(self):
+        # bản mã tạo trước khi có đóng gói theo khóa: mỗi block là 15 ký tự UTF-8, không có marker
+        K1, K2 = self.crypto_system.generate_keypair(512)
+        x = "Xin chào thế giới! Đây là một chuỗi dài hơn 15 ký tự."
+        legacy = self.crypto_system.encrypt(K1, Plaintext.from_string(x))
+        decrypted = self.crypto_system.decrypt(K2, legacy)
+        self.assertIsNone(decrypted.block_size)
+        self.assertEqual(x, self.crypto_system.plaintext2str(K2, decrypted))
+        self.assertEqual(x, self.crypto_system.plaintext2str(K2, Plaintext(decrypted.numbers)))
+        self.assertEqual(decrypted.block_size, self.crypto_system.decrypt_many(K2, [legacy])[0].block_size)
+
+class ElGamalSubgroupCryptoSystemTest(CryptoSystemTest[ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey, ElGamalCiphertext]):
+    def create_crypto_system(self) -> ElGamalCryptoSystem:
+        return ElGamalCryptoSystem(subgroup_bits=SUBGROUP_BITS)
+    
+    def test_encrypt_many(self):
+        K1, K2 = self.crypto_system.generate_keypair()
+        xs = ["DZ" * 60 * i for i in range(1, 40)]
+        plain_texts = [self.crypto_system.str2plaintext(K1, x) for x in xs]
+        # đủ nhiều block để workers=2 thật sự đi qua pool tiến trình
+        self.assertGreater(sum(len(pt.numbers) for pt in plain_texts), 4 * PARALLEL_THRESHOLD)
+        try:
+            encrypted = self.crypto_system.encrypt_many(K1, plain_texts, workers=2)
+            self.assertIsNotNone(self.crypto_system._pool)
+            self.crypto_system.close()
+            decrypted = self.crypto_system.decrypt_many(K2, encrypted, workers=2)
+            self.assertIsNotNone(self.crypto_system._pool)
+        finally:
+            self.crypto_system.close()
+        self.assertEqual([len(pt.numbers) for pt in plain_texts], [len(c) for c in encrypted])
+        self.assertEqual(xs, [self.crypto_system.plaintext2str(K2, x) for x in decrypted])
+
+    def test_decrypt_rejects_small_order_y1(self):
+        K1, K2 = self.crypto_system.generate_keypair()
+        p, q = K1.p, K1.q
+        cipher_text = self.crypto_system.encrypt(K1, self.crypto_system.str2plaintext(K1, "DZ"))
+        y2 = cipher_text.pair(0).y2
+        # phần tử cấp 2 (p - 1) và phần tử cấp chia hết (p - 1)/q (nằm ngoài nhóm con)
+        outside = gmpy2.powmod(K1.g + 1, q, p) if gmpy2.powmod(K1.g + 1, q, p) != 1 else p - 1
+        for y1 in (p - 1, outside, 1, 0, p):
+            with self.assertRaises(ValueError):
+                self.crypto_system.decrypt(K2, ElGamalCiphertext([ElGamalCiphertextPair(y1, y2)]))
+
+    def test_randomness_pool(self):
+        K1, K2 = self.crypto_system.generate_keypair()
+        pool = K1.start_randomness_pool(capacity=8, low_watermark=2)
+        try:
+            pool.fill()
+            x = "DZ" * 40
+            decrypted = self.crypto_system.decrypt(K2, self.crypto_system.encrypt(K1, self.crypto_system.str2plaintext(K1, x)))
+            self.assertEqual(x, self.crypto_system.plaintext2str(K2, decrypted))
+            self.assertGreater(pool.stats()["hits"], 0)
+        finally:
+            K1.stop_randomness_pool()
+
+    def test_encrypt_multi(self):
+        K1, K2 = self.crypto_system.generate_keypair()
+        p, g, q = K1.p, K1.g, K1.q
+        private_keys = [K2] + [ElGamalCryptoPrivateKey(p, secrets.randbelow(q - 1) + 1, q) for _ in range(2)]
+        public_keys = [ElGamalCryptoPublicKey(p, g, pow(g, k.a, p), q) for k in private_keys]
+        public_keys[1].precompute(1 << 16)
+        x = "DZ" * 100
+        multi = self.crypto_system.encrypt_multi(public_keys, self.crypto_system.str2plaintext(K1, x))
+        self.assertEqual(multi.recipients, 3)
+        for i, private_key in enumerate(private_keys):
+            decrypted = self.crypto_system.decrypt(private_key, multi.for_recipient(i))
+            self.assertEqual(x, self.crypto_system.plaintext2str(private_key, decrypted))
+        other, _ = self.crypto_system.generate_keypair()
+        with self.assertRaises(ValueError):
+            self.crypto_system.encrypt_multi([K1, other], Plaintext([1]))
+
+class BatchInvertTest(unittest.TestCase):
+    def test_batch_invert(self):
+        p = gmpy2.next_prime(gmpy2.mpz(2) ** 127)
+        values = [gmpy2.mpz(v) for v in (1, 2, 3, p - 1, 12345678901234567890)]
+        self.assertEqual(_batch_invert(values, p), [gmpy2.invert(v, p) for v in values])
+        self.assertEqual(_batch_invert([], p), [])
+        with self.assertRaises(ValueError):
+            _batch_invert([gmpy2.mpz(5), p], p)
+    
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
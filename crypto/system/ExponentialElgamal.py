@@ -0,0 +1,242 @@
+import gmpy2
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import unittest
+
+from typing import Iterable
+
+from ..arith.multiexp import multi_pow
+from .CryptoElgamal import ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey
+
+# ElGamal mũ (cộng đồng cấu): mã hóa g^m thay vì m
+#   E(m1) · E(m2) = E(m1 + m2),  E(m)^c = E(c·m)
+# Giải mã cho ra g^m; m (bị chặn, 0 <= m < bound) được tìm bằng baby-step giant-step
+# trên bảng DiscreteLogTable tính sẵn, lưu ra file và mmap để không phải dựng lại.
+
+_TABLE_MAGIC = b"EGDL"
+_TABLE_VERSION = 1
+_TABLE_HEADER = struct.Struct(">4sB3xQQ32s")   # magic, version, baby_steps, slots, fingerprint(p, g, baby_steps)
+_SLOT = struct.Struct(">QQ")                    # (64 bit thấp của g^j, j + 1); j + 1 = 0 → ô trống
+_KEY_MASK = (1 << 64) - 1
+
+
+class ExponentialElGamalCiphertext:
+    __slots__ = ("y1", "y2", "p")
+
+    def __init__(self, y1: int, y2: int, p: int):
+        self.y1 = y1
+        self.y2 = y2
+        self.p = p
+
+    def __add__(self, other: "ExponentialElGamalCiphertext") -> "ExponentialElGamalCiphertext":
+        """E(m1) + E(m2) = E(m1 + m2): nhân từng thành phần mod p."""
+        if other.p != self.p:
+            raise ValueError("hai bản mã thuộc hai nhóm khác nhau")
+        return ExponentialElGamalCiphertext(self.y1 * other.y1 % self.p, self.y2 * other.y2 % self.p, self.p)
+
+    def __mul__(self, scalar: int) -> "ExponentialElGamalCiphertext":
+        """c · E(m) = E(c·m): lũy thừa từng thành phần (c âm dùng nghịch đảo mod p)."""
+        p = self.p
+        return ExponentialElGamalCiphertext(gmpy2.powmod(self.y1, scalar, p), gmpy2.powmod(self.y2, scalar, p), p)
+
+    __rmul__ = __mul__
+
+    def __repr__(self) -> str:
+        return f"ExponentialElGamalCiphertext(y1={self.y1}, y2={self.y2})"
+
+
+def _fingerprint(p: int, g: int, baby_steps: int) -> bytes:
+    width = (p.bit_length() + 7) // 8
+    return hashlib.sha256(int(p).to_bytes(width, "big") + int(g).to_bytes(width, "big") + baby_steps.to_bytes(8, "big")).digest()
+
+
+class DiscreteLogTable:
+    """
+    Bảng baby-step cho log rời rạc cơ số g mod p, với m trong [0, bound):
+    - baby step: g^j, 0 <= j < baby_steps, lưu trong bảng băm địa chỉ mở (dò tuyến tính),
+      mỗi ô 16 byte (64 bit thấp của g^j, j + 1) — tra cứu O(1) trực tiếp trên bộ đệm
+    - giant step: h · g^(-baby_steps·i) cho tới khi trúng một ô của bảng
+    Nếu có 'path': bảng được ghi ra file một lần rồi mmap (chỉ đọc) ở các lần sau;
+    file của (p, g, baby_steps) khác sẽ bị dựng lại.
+    """
+
+    def __init__(self, p: int, g: int, bound: int, baby_steps: int | None = None, path: str | None = None):
+        self.p = gmpy2.mpz(p)
+        self.g = gmpy2.mpz(g)
+        self.bound = bound
+        self.baby_steps = baby_steps or int(gmpy2.isqrt(bound - 1)) + 1
+        self.giant_steps = -(-bound // self.baby_steps)
+        self.path = path
+        self._giant = gmpy2.invert(gmpy2.powmod(self.g, self.baby_steps, self.p), self.p)
+        self._mmap = None
+
+        fingerprint = _fingerprint(self.p, self.g, self.baby_steps)
+        if path and not self._open(path, fingerprint):
+            data = self._build(fingerprint)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._open(path, fingerprint)
+        elif not path:
+            self._buffer = memoryview(self._build(fingerprint))
+            self._slots = (len(self._buffer) - _TABLE_HEADER.size) // _SLOT.size
+
+    def _open(self, path: str, fingerprint: bytes) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            header = f.read(_TABLE_HEADER.size)
+            if len(header) != _TABLE_HEADER.size:
+                return False
+            magic, version, baby_steps, slots, stored = _TABLE_HEADER.unpack(header)
+            if (magic, version, baby_steps, stored) != (_TABLE_MAGIC, _TABLE_VERSION, self.baby_steps, fingerprint):
+                return False
+            if os.fstat(f.fileno()).st_size != _TABLE_HEADER.size + slots * _SLOT.size:
+                return False
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._slots = slots
+        return True
+
+    def _build(self, fingerprint: bytes) -> bytearray:
+        slots = 1 << max(4, (2 * self.baby_steps - 1).bit_length())   # hệ số tải <= 1/2
+        mask = slots - 1
+        data = bytearray(_TABLE_HEADER.size + slots * _SLOT.size)
+        _TABLE_HEADER.pack_into(data, 0, _TABLE_MAGIC, _TABLE_VERSION, self.baby_steps, slots, fingerprint)
+        x = gmpy2.mpz(1)
+        for j in range(self.baby_steps):
+            key = int(x & _KEY_MASK)
+            slot = key & mask
+            while _SLOT.unpack_from(data, _TABLE_HEADER.size + slot * _SLOT.size)[1]:
+                slot = (slot + 1) & mask
+            _SLOT.pack_into(data, _TABLE_HEADER.size + slot * _SLOT.size, key, j + 1)
+            x = x * self.g % self.p
+        return data
+
+    def _candidates(self, x) -> Iterable[int]:
+        key = int(x & _KEY_MASK)
+        mask = self._slots - 1
+        slot = key & mask
+        while True:
+            stored, j1 = _SLOT.unpack_from(self._buffer, _TABLE_HEADER.size + slot * _SLOT.size)
+            if not j1:
+                return
+            if stored == key:
+                yield j1 - 1
+            slot = (slot + 1) & mask
+
+    def log(self, h: int) -> int:
+        """m với g^m = h (mod p), 0 <= m < baby_steps · giant_steps; không tìm thấy → ValueError."""
+        gamma = gmpy2.mpz(h) % self.p
+        for i in range(self.giant_steps):
+            for j in self._candidates(gamma):
+                m = i * self.baby_steps + j
+                # khóa chỉ là 64 bit thấp → xác nhận lại trước khi trả về
+                if gmpy2.powmod(self.g, m, self.p) == h % self.p:
+                    return m
+            gamma = gamma * self._giant % self.p
+        raise ValueError("giá trị giải mã nằm ngoài phạm vi của bảng log rời rạc")
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._buffer)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._buffer.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "DiscreteLogTable":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ExponentialElGamalSystem:
+    """ElGamal cộng đồng cấu trên các lớp khóa ElGamalCryptoPublicKey / ElGamalCryptoPrivateKey sẵn có."""
+
+    def encrypt(self, public_key: ElGamalCryptoPublicKey, m: int) -> ExponentialElGamalCiphertext:
+        y1, s = public_key.random_pair()
+        return ExponentialElGamalCiphertext(y1, public_key.pow_g(m) * s % public_key.p, public_key.p)
+
+    def add(self, cipher_texts: Iterable[ExponentialElGamalCiphertext]) -> ExponentialElGamalCiphertext:
+        """Tổng (đã mã hóa) của nhiều bản mã: chỉ N - 1 phép nhân cho mỗi thành phần."""
+        total = None
+        for cipher_text in cipher_texts:
+            total = cipher_text if total is None else total + cipher_text
+        if total is None:
+            raise ValueError("cần ít nhất một bản mã")
+        return total
+
+    def combine(self, cipher_texts: Iterable[ExponentialElGamalCiphertext], weights: Iterable[int]) -> ExponentialElGamalCiphertext:
+        """E(Σ w_i·m_i): mỗi thành phần là một lần nhân lũy thừa đồng thời (multi_pow) thay vì N lần pow rồi nhân."""
+        cipher_texts = list(cipher_texts)
+        weights = list(weights)
+        if not cipher_texts or len(weights) != len(cipher_texts):
+            raise ValueError("cần ít nhất một bản mã và đúng một hệ số cho mỗi bản mã")
+        p = cipher_texts[0].p
+        if any(c.p != p for c in cipher_texts):
+            raise ValueError("các bản mã thuộc các nhóm khác nhau")
+        return ExponentialElGamalCiphertext(
+            multi_pow([c.y1 for c in cipher_texts], weights, p),
+            multi_pow([c.y2 for c in cipher_texts], weights, p),
+            p,
+        )
+
+    def scalar_mul(self, cipher_text: ExponentialElGamalCiphertext, scalar: int) -> ExponentialElGamalCiphertext:
+        return cipher_text * scalar
+
+    def decrypt_power(self, private_key: ElGamalCryptoPrivateKey, cipher_text: ExponentialElGamalCiphertext):
+        """g^m; s^-1 = y1^(order - a) với order = q (nhóm con) hoặc p - 1."""
+        p = gmpy2.mpz(private_key.p)
+        order = private_key.q or p - 1
+        return cipher_text.y2 * gmpy2.powmod(cipher_text.y1, order - private_key.a, p) % p
+
+    def decrypt(self, private_key: ElGamalCryptoPrivateKey, cipher_text: ExponentialElGamalCiphertext, table: DiscreteLogTable) -> int:
+        return table.log(self.decrypt_power(private_key, cipher_text))
+
+
+class ExponentialElGamalTest(unittest.TestCase):
+    def setUp(self):
+        from .CryptoElgamal import ElGamalCryptoSystem
+        self.K1, self.K2 = ElGamalCryptoSystem(subgroup_bits=160).generate_keypair(512)
+        self.system = ExponentialElGamalSystem()
+
+    def test_tally(self):
+        values = [3, 0, 17, 250, 1]
+        table = DiscreteLogTable(self.K1.p, self.K1.g, 10_000)
+        total = self.system.add(self.system.encrypt(self.K1, m) for m in values)
+        self.assertEqual(self.system.decrypt(self.K2, total, table), sum(values))
+        self.assertEqual(self.system.decrypt(self.K2, 3 * total + self.system.encrypt(self.K1, 5), table), 3 * sum(values) + 5)
+        self.assertEqual(self.system.decrypt(self.K2, self.system.encrypt(self.K1, 9_999), table), 9_999)
+        with self.assertRaises(ValueError):
+            self.system.decrypt(self.K2, self.system.encrypt(self.K1, 20_000), table)
+
+    def test_combine(self):
+        values, weights = [4, 9, 2, 30], [3, 1, -2, 5]
+        table = DiscreteLogTable(self.K1.p, self.K1.g, 10_000)
+        combined = self.system.combine([self.system.encrypt(self.K1, m) for m in values], weights)
+        self.assertEqual(self.system.decrypt(self.K2, combined, table), sum(w * m for w, m in zip(weights, values)))
+        with self.assertRaises(ValueError):
+            self.system.combine([self.system.encrypt(self.K1, 1)], [1, 2])
+
+    def test_persisted_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dlog.bin")
+            with DiscreteLogTable(self.K1.p, self.K1.g, 5_000, path=path) as table:
+                self.assertEqual(table.log(gmpy2.powmod(self.K1.g, 4321, self.K1.p)), 4321)
+            mtime = os.path.getmtime(path)
+            with DiscreteLogTable(self.K1.p, self.K1.g, 5_000, path=path) as table:
+                self.assertIsNotNone(table._mmap)
+                self.assertEqual(table.log(gmpy2.powmod(self.K1.g, 77, self.K1.p)), 77)
+            self.assertEqual(os.path.getmtime(path), mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
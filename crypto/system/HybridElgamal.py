@@ -0,0 +1,252 @@
+import gmpy2
+import hashlib
+import hmac
+import struct
+import unittest
+
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .CryptoElgamal import ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey
+
+# Chế độ lai KEM/DEM:
+# - KEM: một cặp ElGamal (y1 = g^k, s = beta^k) cho cả thông điệp, khóa phiên = SHAKE-256(s || y1)
+# - DEM: payload chia thành các frame; frame i được XOR với dòng khóa SHAKE-256(enc_key || i)
+#   và xác thực bằng HMAC-SHA256(mac_key, i || cờ cuối || bản mã) cắt còn TAG_SIZE byte.
+#   Cờ frame cuối nằm trong MAC nên không thể cắt bớt, đổi thứ tự hay nối thêm frame.
+# Định dạng: [2 byte độ dài y1][y1] rồi các frame [4 byte độ dài | bit cờ cuối][bản mã][tag]
+
+FRAME_SIZE = 1 << 16
+TAG_SIZE = 16
+_FINAL = 1 << 31
+_KDF_LABEL = b"elgamal-hybrid-v1"
+
+
+def _int_bytes(x: int, width: int) -> bytes:
+    return int(x).to_bytes(width, "big")
+
+
+def _session_keys(s: int, y1: int, p: int) -> tuple[bytes, bytes]:
+    width = (p.bit_length() + 7) // 8
+    okm = hashlib.shake_256(_KDF_LABEL + _int_bytes(s, width) + _int_bytes(y1, width)).digest(64)
+    return okm[:32], okm[32:]
+
+
+def _keystream_xor(enc_key: bytes, index: int, data: bytes) -> bytes:
+    if not data:
+        return b""
+    stream = hashlib.shake_256(enc_key + index.to_bytes(8, "big")).digest(len(data))
+    return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(data), "big")
+
+
+def _frame_tag(mac_key: bytes, index: int, final: bool, body: bytes) -> bytes:
+    header = index.to_bytes(8, "big") + (b"\x01" if final else b"\x00")
+    return hmac.new(mac_key, header + body, hashlib.sha256).digest()[:TAG_SIZE]
+
+
+class HybridEncryptor:
+    """
+    Mã hóa lai dạng luồng: header() một lần, update() trả về các frame đầy đủ,
+    finalize() trả về frame cuối (luôn có, kể cả khi payload rỗng).
+    """
+
+    def __init__(self, public_key: "ElGamalCryptoPublicKey", frame_size: int = FRAME_SIZE):
+        if not 0 < frame_size < _FINAL:
+            raise ValueError("frame_size không hợp lệ")
+        self.p = public_key.p
+        self.frame_size = frame_size
+        # dùng chung random_pair với encrypt (kể cả kho tính sẵn nếu có)
+        self.y1, s = public_key.random_pair()
+        self._enc_key, self._mac_key = _session_keys(s, self.y1, self.p)
+        self._buffer = bytearray()
+        self._index = 0
+        self._finalized = False
+
+    def header(self) -> bytes:
+        width = (self.p.bit_length() + 7) // 8
+        return struct.pack(">H", width) + _int_bytes(self.y1, width)
+
+    def _frame(self, data: bytes, final: bool) -> bytes:
+        body = _keystream_xor(self._enc_key, self._index, data)
+        tag = _frame_tag(self._mac_key, self._index, final, body)
+        self._index += 1
+        return struct.pack(">I", len(body) | (_FINAL if final else 0)) + body + tag
+
+    def update(self, data: bytes) -> bytes:
+        if self._finalized:
+            raise ValueError("HybridEncryptor đã finalize")
+        self._buffer += data
+        out = []
+        # giữ lại ít nhất 1 byte để frame cuối không bao giờ rỗng khi payload khác rỗng
+        while len(self._buffer) > self.frame_size:
+            out.append(self._frame(bytes(self._buffer[:self.frame_size]), False))
+            del self._buffer[:self.frame_size]
+        return b"".join(out)
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise ValueError("HybridEncryptor đã finalize")
+        self._finalized = True
+        frame = self._frame(bytes(self._buffer), True)
+        self._buffer.clear()
+        return frame
+
+
+class HybridDecryptor:
+    """Giải mã luồng frame; chỉ trả về dữ liệu của frame đã xác thực."""
+
+    def __init__(self, private_key: "ElGamalCryptoPrivateKey", y1: int):
+        p = private_key.p
+        if not 1 < y1 < p:
+            raise ValueError("y1 không hợp lệ")
+        # khóa nhóm con: y1 cấp nhỏ f làm lộ a mod f qua kết quả xác thực frame → buộc y1^q = 1
+        if private_key.q and gmpy2.powmod(y1, private_key.q, p) != 1:
+            raise ValueError("y1 không thuộc nhóm con cấp q")
+        s = gmpy2.powmod(y1, private_key.a, p)
+        self._enc_key, self._mac_key = _session_keys(s, y1, p)
+        self._buffer = bytearray()
+        self._index = 0
+        self.finished = False
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        out = []
+        while len(self._buffer) >= 4:
+            if self.finished:
+                raise ValueError("dữ liệu thừa sau frame cuối")
+            (word,) = struct.unpack_from(">I", self._buffer)
+            size, final = word & (_FINAL - 1), bool(word & _FINAL)
+            end = 4 + size + TAG_SIZE
+            if len(self._buffer) < end:
+                break
+            body = bytes(self._buffer[4:4 + size])
+            tag = bytes(self._buffer[4 + size:end])
+            if not hmac.compare_digest(tag, _frame_tag(self._mac_key, self._index, final, body)):
+                raise ValueError("frame không xác thực được")
+            out.append(_keystream_xor(self._enc_key, self._index, body))
+            del self._buffer[:end]
+            self._index += 1
+            self.finished = final
+        return b"".join(out)
+
+    def finalize(self) -> None:
+        if self._buffer:
+            raise ValueError("dữ liệu thừa hoặc frame bị cắt")
+        if not self.finished:
+            raise ValueError("thiếu frame cuối (bản mã bị cắt)")
+
+
+def _read_header(data: bytes) -> tuple[int, int]:
+    """(y1, số byte của header) từ đầu bản mã lai."""
+    if len(data) < 2:
+        raise ValueError("header bản mã lai bị cắt")
+    (width,) = struct.unpack_from(">H", data)
+    if len(data) < 2 + width:
+        raise ValueError("header bản mã lai bị cắt")
+    return int.from_bytes(data[2:2 + width], "big"), 2 + width
+
+
+class ElGamalHybridCiphertext:
+    def __init__(self, y1: int, frames: bytes):
+        self.y1 = y1
+        self.frames = frames  # các frame đã đóng khung, nối liền
+
+    def to_bytes(self, p: int) -> bytes:
+        width = (p.bit_length() + 7) // 8
+        return struct.pack(">H", width) + _int_bytes(self.y1, width) + self.frames
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "ElGamalHybridCiphertext":
+        y1, offset = _read_header(data)
+        return ElGamalHybridCiphertext(y1, bytes(data[offset:]))
+
+    def __repr__(self) -> str:
+        return f"ElGamalHybridCiphertext(y1={self.y1}, frames=<{len(self.frames)} bytes>)"
+
+
+def hybrid_encrypt(public_key: "ElGamalCryptoPublicKey", data: bytes, frame_size: int = FRAME_SIZE) -> ElGamalHybridCiphertext:
+    encryptor = HybridEncryptor(public_key, frame_size)
+    return ElGamalHybridCiphertext(encryptor.y1, encryptor.update(data) + encryptor.finalize())
+
+
+def hybrid_decrypt(private_key: "ElGamalCryptoPrivateKey", cipher_text: ElGamalHybridCiphertext) -> bytes:
+    decryptor = HybridDecryptor(private_key, cipher_text.y1)
+    data = decryptor.update(cipher_text.frames)
+    decryptor.finalize()
+    return data
+
+
+def hybrid_encrypt_stream(public_key: "ElGamalCryptoPublicKey", chunks: Iterable[bytes], frame_size: int = FRAME_SIZE) -> Iterator[bytes]:
+    """Mã hóa một luồng bytes: phát header rồi từng frame, bộ nhớ chỉ cỡ một frame."""
+    encryptor = HybridEncryptor(public_key, frame_size)
+    yield encryptor.header()
+    for chunk in chunks:
+        out = encryptor.update(chunk)
+        if out:
+            yield out
+    yield encryptor.finalize()
+
+
+def hybrid_decrypt_stream(private_key: "ElGamalCryptoPrivateKey", chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Ngược lại của hybrid_encrypt_stream; lỗi xác thực hoặc cắt cụt → ValueError."""
+    head = bytearray()
+    decryptor = None
+    for chunk in chunks:
+        if decryptor is None:
+            head += chunk
+            try:
+                y1, offset = _read_header(head)
+            except ValueError:
+                continue
+            decryptor = HybridDecryptor(private_key, y1)
+            chunk = bytes(head[offset:])
+        out = decryptor.update(chunk)
+        if out:
+            yield out
+    if decryptor is None:
+        raise ValueError("header bản mã lai bị cắt")
+    decryptor.finalize()
+
+
+class HybridElgamalTest(unittest.TestCase):
+    def setUp(self):
+        from .CryptoElgamal import ElGamalCryptoSystem
+        self.crypto_system = ElGamalCryptoSystem(subgroup_bits=256)
+        self.K1, self.K2 = self.crypto_system.generate_keypair()
+
+    def test_roundtrip(self):
+        for size in (0, 1, 100, 1000, 4096):
+            data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+            ct = hybrid_encrypt(self.K1, data, frame_size=256)
+            self.assertEqual(hybrid_decrypt(self.K2, ct), data)
+            self.assertEqual(hybrid_decrypt(self.K2, ElGamalHybridCiphertext.from_bytes(ct.to_bytes(self.K1.p))), data)
+
+    def test_stream(self):
+        data = b"ElGamal " * 5000
+        chunks = [data[i:i + 777] for i in range(0, len(data), 777)]
+        wire = b"".join(hybrid_encrypt_stream(self.K1, chunks, frame_size=1000))
+        pieces = [wire[i:i + 333] for i in range(0, len(wire), 333)]
+        self.assertEqual(b"".join(hybrid_decrypt_stream(self.K2, pieces)), data)
+
+    def test_tamper_and_truncation(self):
+        ct = hybrid_encrypt(self.K1, b"a" * 1000, frame_size=256)
+        broken = bytearray(ct.frames)
+        broken[10] ^= 1
+        with self.assertRaises(ValueError):
+            hybrid_decrypt(self.K2, ElGamalHybridCiphertext(ct.y1, bytes(broken)))
+        first_frames = ct.frames[:3 * (4 + 256 + TAG_SIZE)]
+        with self.assertRaises(ValueError):
+            hybrid_decrypt(self.K2, ElGamalHybridCiphertext(ct.y1, first_frames))
+
+    def test_rejects_small_order_y1(self):
+        ct = hybrid_encrypt(self.K1, b"secret", frame_size=256)
+        p = self.K1.p
+        for y1 in (p - 1, ct.y1 * (p - 1) % p):
+            with self.assertRaises(ValueError):
+                hybrid_decrypt(self.K2, ElGamalHybridCiphertext(y1, ct.frames))
+            with self.assertRaises(ValueError):
+                HybridDecryptor(self.K2, y1)
+
+
+if __name__ == "__main__":
+    unittest.main()
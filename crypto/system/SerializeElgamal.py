@@ -0,0 +1,198 @@
+import gmpy2
+import struct
+import unittest
+
+from ..pubkey import Plaintext
+from .CryptoElgamal import ElGamalCiphertext, ElGamalCiphertextPair, ElGamalCryptoPublicKey, ElGamalCryptoPrivateKey
+from .SignatureElgamal import ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey
+
+# Định dạng nhị phân có phiên bản cho bản mã, khóa và chữ ký:
+#   MAGIC (2) | VERSION (1) | KIND (1) | độ dài header H (2) | header (H byte) | thân
+#   header v1 = độ rộng W (2) | cờ (1) | số phần tử N (4); đọc bỏ qua phần header dư (phiên bản sau thêm trường)
+#   thân = các số nguyên W byte big-endian, đệm đến độ dài của modulus
+# Bản mã: N cặp (y1, y2). Khóa: (p, g, beta | a, ...) theo KIND, thêm q nếu cờ HAS_Q. Chữ ký: N số.
+
+MAGIC = b"EG"
+VERSION = 1
+
+KIND_CIPHERTEXT = 1
+KIND_PUBLIC_KEY = 2
+KIND_PRIVATE_KEY = 3
+KIND_SIGNER_KEY = 4
+KIND_VERIFIER_KEY = 5
+KIND_SIGNATURE = 6
+
+FLAG_HAS_Q = 0x01
+
+_PREFIX = struct.Struct(">2sBBH")
+_HEADER_V1 = struct.Struct(">HBI")
+
+# KIND → (lớp, tên thuộc tính theo thứ tự ghi, không kể q)
+_KEY_LAYOUT = {
+    KIND_PUBLIC_KEY: (ElGamalCryptoPublicKey, ("p", "g", "beta")),
+    KIND_PRIVATE_KEY: (ElGamalCryptoPrivateKey, ("p", "a")),
+    KIND_SIGNER_KEY: (ElGamalSignatureSignerKey, ("p", "g", "a")),
+    KIND_VERIFIER_KEY: (ElGamalSignatureVerifierKey, ("p", "g", "beta")),
+}
+
+
+def _width(p: int) -> int:
+    return (p.bit_length() + 7) // 8
+
+
+def _header(kind: int, width: int, flags: int, count: int) -> bytes:
+    header = _HEADER_V1.pack(width, flags, count)
+    return _PREFIX.pack(MAGIC, VERSION, kind, len(header)) + header
+
+
+def _pack(kind: int, width: int, flags: int, count: int, values) -> bytes:
+    out = bytearray(_header(kind, width, flags, count))
+    try:
+        for v in values:
+            out += int(v).to_bytes(width, "big")
+    except OverflowError:
+        raise ValueError("số nguyên lớn hơn độ rộng của modulus") from None
+    return bytes(out)
+
+
+def _unpack_raw(data, expected_kind: int | None = None) -> tuple[int, int, int, int, memoryview]:
+    """(kind, width, flags, count, thân dạng memoryview — chưa giải mã thành số)."""
+    view = memoryview(data).cast("B")
+    if len(view) < _PREFIX.size:
+        raise ValueError("dữ liệu bị cắt")
+    magic, version, kind, header_len = _PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("không đúng định dạng (sai magic)")
+    if version != VERSION:
+        raise ValueError(f"phiên bản định dạng không hỗ trợ: {version}")
+    if expected_kind is not None and kind != expected_kind:
+        raise ValueError(f"sai loại dữ liệu: {kind}, cần {expected_kind}")
+    if header_len < _HEADER_V1.size or len(view) < _PREFIX.size + header_len:
+        raise ValueError("header bị cắt")
+    width, flags, count = _HEADER_V1.unpack_from(view, _PREFIX.size)
+    body = view[_PREFIX.size + header_len:]
+    if width == 0 or len(body) % width:
+        raise ValueError("thân dữ liệu bị cắt")
+    return kind, width, flags, count, body
+
+
+def _unpack(data, expected_kind: int | None = None) -> tuple[int, int, int, int, list]:
+    """(kind, width, flags, count, các số nguyên của thân), đọc thẳng trên memoryview."""
+    kind, width, flags, count, body = _unpack_raw(data, expected_kind)
+    values = [gmpy2.mpz(int.from_bytes(body[i:i + width], "big")) for i in range(0, len(body), width)]
+    return kind, width, flags, count, values
+
+
+# === Bản mã ===
+
+# Thân bản mã và ElGamalCiphertext cùng dùng số W byte big-endian: chỉ cần đan xen / tách
+# các bản ghi trên bộ đệm, không giải mã số nào.
+
+def dump_ciphertext(cipher_text: ElGamalCiphertext, p: int) -> bytes:
+    width = _width(p)
+    try:
+        y1s, y2s = cipher_text.buffers(width)
+    except OverflowError:
+        raise ValueError("số nguyên lớn hơn độ rộng của modulus") from None
+    body = bytearray(len(y1s) + len(y2s))
+    for i in range(0, len(y1s), width):
+        body[2 * i:2 * i + width] = y1s[i:i + width]
+        body[2 * i + width:2 * i + 2 * width] = y2s[i:i + width]
+    return _header(KIND_CIPHERTEXT, width, 0, len(cipher_text)) + bytes(body)
+
+
+def load_ciphertext(data) -> ElGamalCiphertext:
+    _, width, _, count, body = _unpack_raw(data, KIND_CIPHERTEXT)
+    record = 2 * width
+    if len(body) != count * record:
+        raise ValueError("số cặp không khớp header")
+    y1s = b"".join(body[i:i + width] for i in range(0, len(body), record))
+    y2s = b"".join(body[i + width:i + record] for i in range(0, len(body), record))
+    return ElGamalCiphertext.from_buffers(y1s, y2s, width)
+
+
+# === Khóa ===
+
+def dump_key(key) -> bytes:
+    """Ghi một trong bốn lớp khóa ElGamal; loại khóa được lưu trong KIND."""
+    for kind, (cls, fields) in _KEY_LAYOUT.items():
+        if type(key) is cls:
+            values = [getattr(key, name) for name in fields]
+            flags = 0
+            if key.q:
+                values.append(key.q)
+                flags |= FLAG_HAS_Q
+            return _pack(kind, _width(key.p), flags, len(values), values)
+    raise TypeError(f"không hỗ trợ ghi khóa kiểu {type(key).__name__}")
+
+
+def load_key(data):
+    kind, _, flags, count, values = _unpack(data)
+    if kind not in _KEY_LAYOUT:
+        raise ValueError(f"không phải dữ liệu khóa: {kind}")
+    cls, fields = _KEY_LAYOUT[kind]
+    expected = len(fields) + (1 if flags & FLAG_HAS_Q else 0)
+    if count != expected or len(values) != expected:
+        raise ValueError("số trường của khóa không khớp header")
+    q = values[len(fields)] if flags & FLAG_HAS_Q else None
+    return cls(*values[:len(fields)], q=q)
+
+
+# === Chữ ký ===
+
+def dump_signature(signature: Plaintext, p: int) -> bytes:
+    return _pack(KIND_SIGNATURE, _width(p), 0, len(signature.numbers), signature.numbers)
+
+
+def load_signature(data) -> Plaintext:
+    _, _, _, count, values = _unpack(data, KIND_SIGNATURE)
+    if len(values) != count:
+        raise ValueError("số phần tử không khớp header")
+    return Plaintext(values)
+
+
+class SerializeElgamalTest(unittest.TestCase):
+    def setUp(self):
+        self.p = gmpy2.next_prime(gmpy2.mpz(2) ** 521)
+
+    def test_ciphertext(self):
+        p = self.p
+        ct = ElGamalCiphertext([ElGamalCiphertextPair(1, p - 1), ElGamalCiphertextPair(12345, 2 ** 300)])
+        data = dump_ciphertext(ct, p)
+        self.assertEqual(len(data), 6 + 7 + 4 * 66)
+        loaded = load_ciphertext(bytearray(data))
+        self.assertEqual([(c.y1, c.y2) for c in loaded.cipher_pairs], [(c.y1, c.y2) for c in ct.cipher_pairs])
+        self.assertEqual(load_ciphertext(dump_ciphertext(ElGamalCiphertext([]), p)).cipher_pairs, [])
+        # thân đọc thẳng vào bộ đệm của bản mã, cùng layout với _pack từng số
+        self.assertEqual(loaded.buffers(), ct.buffers(66))
+        self.assertEqual(data, _pack(KIND_CIPHERTEXT, 66, 0, 2, [1, p - 1, 12345, 2 ** 300]))
+        with self.assertRaises(ValueError):
+            load_ciphertext(data[:-66])
+        with self.assertRaises(ValueError):
+            dump_ciphertext(ct, gmpy2.mpz(2) ** 127 - 1)
+
+    def test_keys(self):
+        p = self.p
+        for key in (ElGamalCryptoPublicKey(p, 3, 5), ElGamalCryptoPublicKey(p, 3, 5, q=7),
+                    ElGamalCryptoPrivateKey(p, 11), ElGamalSignatureSignerKey(p, 3, 11, q=7),
+                    ElGamalSignatureVerifierKey(p, 3, 5)):
+            loaded = load_key(dump_key(key))
+            self.assertIs(type(loaded), type(key))
+            self.assertEqual(repr(loaded), repr(key))
+
+    def test_signature_and_errors(self):
+        p = self.p
+        sig = Plaintext([2, 3, p - 2, 1])
+        self.assertEqual(load_signature(dump_signature(sig, p)).numbers, sig.numbers)
+        data = dump_signature(sig, p)
+        for broken in (data[:-1], b"XX" + data[2:], data[:2] + b"\x09" + data[3:], data[:5]):
+            with self.assertRaises(ValueError):
+                load_signature(broken)
+        with self.assertRaises(ValueError):
+            load_ciphertext(data)
+        with self.assertRaises(ValueError):
+            dump_signature(Plaintext([p * p]), p)
+
+
+if __name__ == "__main__":
+    unittest.main()
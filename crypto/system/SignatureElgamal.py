@@ -1,36 +1,229 @@
-from sympy import gcd
-from ..pubkey import SignatureSystem, Plaintext, SignatureSystemTest
+from ..pubkey import SignatureSystem, Plaintext, SignatureSystemTest, block_size_for
 from .CryptoElgamal import ElGamal_generate_keys
-import random
+from ..prime.generate_prime import PrimeGenerator
+from ..prime.parameter_pool import ParameterPool
+from ..arith.fixed_base import FixedBaseTable, DEFAULT_MEMORY_BUDGET
+from ..arith.multiexp import multi_pow
+from ..arith.precompute import PrecomputePool, DEFAULT_CAPACITY, DEFAULT_LOW_WATERMARK
+import gmpy2
+import hashlib
+import secrets
+import sys
+import unittest
+
+from typing import Iterable
+from unittest import mock
 
 SIGNATURE_BITS = 512
+BATCH_WEIGHT_BITS = 64
+_DIGEST_LABEL = b"elgamal-hash-then-sign-v1"
+
+def _subgroup_digest(m: int, q: int) -> int:
+    """Chế độ nhóm con: ký H(m) mod q thay vì m (m mod q sẽ cho phép đổi m thành m + q)."""
+    data = int(m).to_bytes(max(1, (int(m).bit_length() + 7) // 8), "big")
+    return int.from_bytes(hashlib.sha256(data).digest(), "big") % q
+
+def _reblock_for(plain_text: Plaintext, p: int) -> Plaintext:
+    """Bản rõ đóng gói theo khóa khác (vd. vừa giải mã bằng khóa mã hóa) → đóng gói lại theo p của khóa ký."""
+    if plain_text.block_size is None:
+        return plain_text
+    return plain_text.reblock(block_size_for(p))
+
+class ElGamalMessageDigest:
+    """
+    Băm luồng cho chế độ hash-then-sign (SHAKE-256, có nhãn miền riêng):
+    update() nhiều lần với từng đoạn dữ liệu, không cần giữ cả thông điệp trong bộ nhớ.
+    exponent(n) ánh xạ digest vào Z_n (n = q hoặc p - 1), lấy dư 16 byte để phân bố gần đều.
+    """
+    
+    def __init__(self, data: bytes|str = b""):
+        self._hash = hashlib.shake_256(_DIGEST_LABEL)
+        if data:
+            self.update(data)
+    
+    def update(self, data: bytes|str) -> "ElGamalMessageDigest":
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._hash.update(data)
+        return self
+    
+    def copy(self) -> "ElGamalMessageDigest":
+        other = ElGamalMessageDigest()
+        other._hash = self._hash.copy()
+        return other
+    
+    def exponent(self, modulus: int) -> int:
+        size = (modulus.bit_length() + 7) // 8 + 16
+        return int.from_bytes(self._hash.digest(size), "big") % modulus
+    
+def _plaintext_bytes(plain_text: Plaintext) -> bytes:
+    """Dữ liệu được băm ở chế độ digest: bytes gốc nếu đóng gói theo khóa, nếu không thì từng số kèm độ dài."""
+    if plain_text.block_size:
+        return plain_text.to_bytes()
+    out = []
+    for m in plain_text.numbers:
+        b = int(m).to_bytes((int(m).bit_length() + 7) // 8, "big")
+        out.append(len(b).to_bytes(4, "big") + b)
+    return b"".join(out)
 
 class ElGamalSignatureSignerKey:
-    def __init__(self, p: int, g: int, a: int):
+    def __init__(self, p: int, g: int, a: int, q: int|None = None):
         self.p = p
         self.g = g 
         self.a = a
+        self.q = q  # cấp nhóm con (chế độ Schnorr); None → số mũ lấy mod p - 1
+        self.g_table: FixedBaseTable|None = None  # sau precompute()
+        # kho (k, g^k, k^-1) tính sẵn, chỉ có sau start_nonce_pool()
+        self.nonce_pool: PrecomputePool|None = None
+        
+    def precompute(self, memory_budget: int = DEFAULT_MEMORY_BUDGET) -> "ElGamalSignatureSignerKey":
+        """Dựng bảng cơ số cố định cho g; sign dùng tự động để tính gamma = g^k."""
+        self.g_table = FixedBaseTable(self.g, self.p, (self.q or self.p).bit_length(), memory_budget)
+        return self
+    
+    def pow_g(self, k: int):
+        return self.g_table.pow(k) if self.g_table else gmpy2.powmod(self.g, k, self.p)
+    
+    def random_nonce(self) -> tuple:
+        """
+        (k, gamma = g^k, k^-1) với nonce k mới: k mod q ở chế độ nhóm con (q nguyên tố nên luôn khả nghịch),
+        k trong [2, p-2] nguyên tố cùng nhau với p - 1 nếu không.
+        """
+        if self.q:
+            k = secrets.randbelow(self.q - 1) + 1
+            return k, self.pow_g(k), gmpy2.invert(k, self.q)
+        order = gmpy2.mpz(self.p - 1)
+        while True:
+            k = secrets.randbelow(self.p - 3) + 2
+            if gmpy2.gcd(k, order) == 1:
+                return k, self.pow_g(k), gmpy2.invert(k, order)
+    
+    def start_nonce_pool(self, capacity: int = DEFAULT_CAPACITY, low_watermark: int = DEFAULT_LOW_WATERMARK) -> PrecomputePool:
+        """
+        Ký offline/online: luồng nền giữ sẵn tối đa 'capacity' bộ (k, g^k, k^-1),
+        sign chỉ còn phép tính delta cho mỗi block khi kho còn hàng. Mỗi nonce chỉ được dùng một lần.
+        """
+        if self.nonce_pool is None:
+            self.nonce_pool = PrecomputePool(self.random_nonce, capacity, low_watermark, name="elgamal-nonce-pool")
+        return self.nonce_pool
+    
+    def stop_nonce_pool(self) -> None:
+        if self.nonce_pool is not None:
+            self.nonce_pool.close()
+            self.nonce_pool = None
         
     def __repr__(self) -> str:
+        if self.q:
+            return f"ElGamalSignatureSignerKey(p={self.p}, g={self.g}, a={self.a}, q={self.q})"
         return f"ElGamalSignatureSignerKey(p={self.p}, g={self.g}, a={self.a})"
     
 class ElGamalSignatureVerifierKey:
-    def __init__(self, p: int, g: int, beta: int):
+    def __init__(self, p: int, g: int, beta: int, q: int|None = None):
         self.p = p
         self.g = g
         self.beta = beta
+        self.q = q
         
     def __repr__(self) -> str:
+        if self.q:
+            return f"ElGamalSignatureVerifierKey(p={self.p}, g={self.g}, beta={self.beta}, q={self.q})"
         return f"ElGamalSignatureVerifierKey(p={self.p}, g={self.g}, beta={self.beta})"
     
+def _sign_exponent(signer_key: "ElGamalSignatureSignerKey", h: int) -> tuple:
+    """(gamma, delta) cho số mũ h đã rút gọn (mod q ở chế độ nhóm con, mod p - 1 nếu không)."""
+    order = signer_key.q or signer_key.p - 1
+    pool = signer_key.nonce_pool
+    while True:
+        item = pool.take() if pool is not None else None
+        k, gamma, k_inv = item if item is not None else signer_key.random_nonce()
+        delta = (k_inv * (h - signer_key.a * gamma)) % order
+        # chế độ nhóm con yêu cầu delta != 0 (verify loại delta = 0)
+        if delta != 0 or not signer_key.q:
+            return gamma, delta
+
+def _verify_exponent(verifier_key: "ElGamalSignatureVerifierKey", h: int, gamma: int, delta: int) -> bool:
+    p, q = verifier_key.p, verifier_key.q
+    if not (0 < gamma < p and (0 < delta < q if q else 0 <= delta < p - 1)):
+        return False
+    # nhóm con: gamma phải có cấp q (giống _batch_screen), để verify và verify_batch luôn cùng kết quả
+    if q and gmpy2.powmod(gamma, q, p) != 1:
+        return False
+    # beta^gamma · gamma^delta · g^(-h) = 1 trong một lần nhân lũy thừa đồng thời;
+    # beta, g thuộc nhóm cấp order nên số mũ của chúng được rút gọn (gamma có thể dài cỡ p)
+    order = q or p - 1
+    return multi_pow((verifier_key.beta, gamma, verifier_key.g), (gamma % order, delta, -h % order), p) == 1
+
+def _batch_screen(verifier_key: "ElGamalSignatureVerifierKey", h: int, gamma: int, delta: int) -> bool:
+    """
+    Kiểm tra rẻ từng phương trình trước khi gộp. Phép thử gộp chỉ đúng trong nhóm cấp nguyên tố:
+    - nhóm con: gamma phải thuộc nhóm cấp q (gamma^q = 1)
+    - p an toàn (Z_p^* = {±1} × nhóm cấp (p-1)/2): thành phần ±1 được so chính xác bằng ký hiệu Legendre
+    Thiếu bước này, sai số -1 sẽ lọt qua phép thử gộp với xác suất 1/2.
+    """
+    p, q = verifier_key.p, verifier_key.q
+    if not (0 < gamma < p and (0 < delta < q if q else 0 <= delta < p - 1)):
+        return False
+    if q:
+        return gmpy2.powmod(gamma, q, p) == 1
+    left = (gmpy2.jacobi(verifier_key.beta, p) if gamma & 1 else 1) * (gmpy2.jacobi(gamma, p) if delta & 1 else 1)
+    return left == (gmpy2.jacobi(verifier_key.g, p) if h & 1 else 1)
+
+def _batch_holds(verifier_key: "ElGamalSignatureVerifierKey", equations: list) -> bool:
+    """
+    Phép thử số mũ nhỏ: với r_i ngẫu nhiên BATCH_WEIGHT_BITS bit,
+    beta^(Σ r_i·gamma_i) · Π gamma_i^(r_i·delta_i) = g^(Σ r_i·h_i); sai lệch lọt qua với xác suất <= 2^-BATCH_WEIGHT_BITS.
+    """
+    p = verifier_key.p
+    order = verifier_key.q or p - 1
+    e_beta = e_g = 0
+    bases, exponents = [verifier_key.beta, verifier_key.g], [0, 0]
+    for h, gamma, delta in equations:
+        r = secrets.randbelow((1 << BATCH_WEIGHT_BITS) - 1) + 1
+        e_beta += r * gamma
+        e_g += r * h
+        bases.append(gamma)
+        exponents.append(r * delta % order)
+    exponents[0], exponents[1] = e_beta % order, -e_g % order
+    return multi_pow(bases, exponents, p) == 1
+
+def _batch_invalid(verifier_key: "ElGamalSignatureVerifierKey", equations: list, indices: list[int], failed: bool = False) -> list[int]:
+    """Chỉ số các phương trình sai, tìm bằng chia đôi; failed=True → đã biết nhóm này sai, bỏ qua lần thử gộp."""
+    if not indices:
+        return []
+    if len(indices) == 1:
+        return [] if _verify_exponent(verifier_key, *equations[indices[0]]) else list(indices)
+    if not failed and _batch_holds(verifier_key, [equations[i] for i in indices]):
+        return []
+    mid = len(indices) // 2
+    left = _batch_invalid(verifier_key, equations, indices[:mid])
+    # nửa trái đúng hết mà cả nhóm sai → lỗi chắc chắn nằm ở nửa phải
+    right = _batch_invalid(verifier_key, equations, indices[mid:], failed=not left)
+    return left + right
+
 class ElGamalSignatureSystem(SignatureSystem[ElGamalSignatureVerifierKey, ElGamalSignatureSignerKey]):
+    def __init__(
+        self,
+        prime_generator: PrimeGenerator|None = None,
+        parameter_pool: ParameterPool|None = None,
+        subgroup_bits: int|None = None,
+        digest_mode: bool = False,
+    ):
+        self.prime_generator = prime_generator
+        self.parameter_pool = parameter_pool
+        self.subgroup_bits = subgroup_bits
+        # True → sign/verify băm cả thông điệp, một cặp (gamma, delta) cho mỗi thông điệp
+        self.digest_mode = digest_mode
+
     def generate_keypair(self, bits: int = SIGNATURE_BITS) -> tuple[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]:
-        public_key_dict, private_key_dict = ElGamal_generate_keys(bits)
+        public_key_dict, private_key_dict = ElGamal_generate_keys(
+            bits, self.prime_generator, self.parameter_pool, self.subgroup_bits
+        )
         verifier_key = ElGamalSignatureVerifierKey(**public_key_dict)
         signer_key = ElGamalSignatureSignerKey(
             p=private_key_dict["p"],
             g=public_key_dict["g"],
-            a=private_key_dict["a"]
+            a=private_key_dict["a"],
+            q=private_key_dict.get("q"),
         )
         return signer_key, verifier_key
     
@@ -39,53 +232,184 @@ class ElGamalSignatureSystem(SignatureSystem[ElGamalSignatureVerifierKey, ElGama
         p = int(input("Enter prime p: "))
         g = int(input("Enter primitive root g: "))
         beta = int(input("Enter beta: "))
-        return ElGamalSignatureVerifierKey(p, g, beta)
+        q = input("Enter subgroup order q (empty for safe prime): ").strip()
+        return ElGamalSignatureVerifierKey(p, g, beta, int(q) if q else None)
+    
+    def new_digest(self, data: bytes|str = b"") -> ElGamalMessageDigest:
+        return ElGamalMessageDigest(data)
+    
+    def sign_digest(self, signer_key: ElGamalSignatureSignerKey, digest: ElGamalMessageDigest) -> Plaintext:
+        """Chữ ký hash-then-sign: đúng một cặp (gamma, delta), chi phí không phụ thuộc độ dài thông điệp."""
+        h = digest.exponent(signer_key.q or signer_key.p - 1)
+        return Plaintext(list(_sign_exponent(signer_key, h)))
+    
+    def verify_digest(self, verifier_key: ElGamalSignatureVerifierKey, digest: ElGamalMessageDigest, signature: Plaintext) -> bool:
+        if len(signature.numbers) != 2:
+            return False
+        h = digest.exponent(verifier_key.q or verifier_key.p - 1)
+        return _verify_exponent(verifier_key, h, *signature.numbers)
     
     def sign(self, signer_key: ElGamalSignatureSignerKey, plain_text: Plaintext) -> Plaintext:
-        p = signer_key.p
-        g = signer_key.g
-        a = signer_key.a
-        
+        if self.digest_mode:
+            return self.sign_digest(signer_key, self.new_digest(_plaintext_bytes(plain_text)))
+        q = signer_key.q
+        plain_text = _reblock_for(plain_text, signer_key.p)
         signature_numbers = []
         for m in plain_text.numbers:
-            while True:
-                k = random.randint(2, p - 2)
-                if gcd(k, p - 1) == 1:
-                    break
-            gamma = pow(g, k, p)
-            k_inv = pow(k, -1, p - 1)
-            delta = (k_inv * (m - a * gamma)) % (p - 1)
+            gamma, delta = _sign_exponent(signer_key, _subgroup_digest(m, q) if q else m)
             signature_numbers.append(gamma)
             signature_numbers.append(delta)
         return Plaintext(signature_numbers)
     
-    def verify(self, verifier_key: ElGamalSignatureVerifierKey, plain_text: Plaintext, signature: Plaintext) -> bool:
-        p = verifier_key.p
-        g = verifier_key.g
-        beta = verifier_key.beta
-        
+    def _equations(self, verifier_key: ElGamalSignatureVerifierKey, plain_text: Plaintext, signature: Plaintext) -> list|None:
+        """Các bộ (h, gamma, delta) cần kiểm tra cho một chữ ký; None nếu chữ ký/thông điệp sai dạng."""
+        q = verifier_key.q
         sig_nums = signature.numbers
+        try:
+            if self.digest_mode:
+                if len(sig_nums) != 2:
+                    return None
+                h = self.new_digest(_plaintext_bytes(plain_text)).exponent(q or verifier_key.p - 1)
+                return [(h, sig_nums[0], sig_nums[1])]
+            plain_text = _reblock_for(plain_text, verifier_key.p)
+        except (ValueError, UnicodeDecodeError):
+            return None
         if len(sig_nums) != 2 * len(plain_text.numbers):
-            return False
-        for i, m in enumerate(plain_text.numbers):
-            gamma, delta = sig_nums[2 * i], sig_nums[2 * i + 1]
-            left = (pow(beta, gamma, p) * pow(gamma, delta, p)) % p
-            right = pow(g, m, p)
-            if left != right:
-                return False
-        return True
+            return None
+        return [(_subgroup_digest(m, q) if q else m, sig_nums[2 * i], sig_nums[2 * i + 1])
+                for i, m in enumerate(plain_text.numbers)]
+    
+    def verify(self, verifier_key: ElGamalSignatureVerifierKey, plain_text: Plaintext, signature: Plaintext) -> bool:
+        equations = self._equations(verifier_key, plain_text, signature)
+        return equations is not None and all(_verify_exponent(verifier_key, *e) for e in equations)
+    
+    def verify_batch(self, verifier_key: ElGamalSignatureVerifierKey, items: Iterable[tuple[Plaintext, Plaintext]]) -> list[bool]:
+        """
+        Xác thực nhiều cặp (thông điệp, chữ ký) cùng một khóa bằng một phép thử gộp;
+        nếu lô sai thì chia đôi để tìm đúng các chữ ký hỏng. Kết quả theo thứ tự của items.
+        """
+        results = []
+        equations, owners = [], []
+        for index, (plain_text, signature) in enumerate(items):
+            current = self._equations(verifier_key, plain_text, signature)
+            ok = current is not None and all(_batch_screen(verifier_key, *e) for e in current)
+            results.append(ok)
+            if ok:
+                equations.extend(current)
+                owners.extend([index] * len(current))
+        for i in _batch_invalid(verifier_key, equations, list(range(len(equations)))):
+            results[owners[i]] = False
+        return results
     
     def str2plaintext_signer(self, signer_key: ElGamalSignatureSignerKey, string: str) -> Plaintext:
-        plain_text = Plaintext.from_string(string)
+        plain_text = Plaintext.from_string(string, block_size_for(signer_key.p))
         return plain_text
     
     def str2plaintext_verifier(self, verifier_key: ElGamalSignatureVerifierKey, string: str) -> Plaintext:
-        plain_text = Plaintext.from_string(string)
+        plain_text = Plaintext.from_string(string, block_size_for(verifier_key.p))
         return plain_text
     
 class ElGamalSignatureSystemTest(SignatureSystemTest[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]):
     def create_signature_system(self) -> SignatureSystem[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]:
         return ElGamalSignatureSystem()
+
+class ElGamalSubgroupSignatureSystemTest(SignatureSystemTest[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]):
+    def create_signature_system(self) -> SignatureSystem[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]:
+        return ElGamalSignatureSystem(subgroup_bits=224)
+
+    def test_nonce_pool(self):
+        k1, k2 = self.signature_system.generate_keypair()
+        pool = k1.start_nonce_pool(capacity=8, low_watermark=2)
+        try:
+            pool.fill()
+            x = "HE" * 300
+            signature_x = self.signature_system.sign(k1, self.signature_system.str2plaintext_signer(k1, x))
+            self.assertTrue(self.signature_system.verify(k2, self.signature_system.str2plaintext_verifier(k2, x), signature_x))
+            self.assertGreater(pool.stats()["hits"], 0)
+            gammas = signature_x.numbers[0::2]
+            self.assertEqual(len(set(gammas)), len(gammas))
+        finally:
+            k1.stop_nonce_pool()
+
+class ElGamalDigestSignatureSystemTest(SignatureSystemTest[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]):
+    def create_signature_system(self) -> SignatureSystem[ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey]:
+        return ElGamalSignatureSystem(subgroup_bits=224, digest_mode=True)
+    
+    def test_incremental_digest(self):
+        k1, k2 = self.signature_system.generate_keypair()
+        x = "HE" * 1000
+        signature_x = self.signature_system.sign(k1, self.signature_system.str2plaintext_signer(k1, x))
+        self.assertEqual(len(signature_x.numbers), 2)
+        digest = self.signature_system.new_digest()
+        for i in range(0, len(x), 7):
+            digest.update(x[i:i + 7])
+        self.assertTrue(self.signature_system.verify_digest(k2, digest, signature_x))
+        self.assertFalse(self.signature_system.verify_digest(k2, digest.copy().update("!"), signature_x))
+
+class ElGamalBatchVerifyTest(unittest.TestCase):
+    def check_batch(self, system: ElGamalSignatureSystem, bits: int = SIGNATURE_BITS):
+        k1, k2 = system.generate_keypair(bits)
+        messages = [system.str2plaintext_signer(k1, f"message {i}" * (i % 3 + 1)) for i in range(12)]
+        signatures = [system.sign(k1, m) for m in messages]
+        self.assertEqual(system.verify_batch(k2, zip(messages, signatures)), [True] * 12)
+        
+        bad = list(signatures)
+        bad[3] = Plaintext(signatures[3].numbers[:-1] + [signatures[3].numbers[-1] + 1])
+        bad[7] = signatures[8]
+        bad[10] = Plaintext(signatures[10].numbers[:1])
+        expected = [i not in (3, 7, 10) for i in range(12)]
+        self.assertEqual(system.verify_batch(k2, zip(messages, bad)), expected)
+        self.assertEqual(system.verify_batch(k2, []), [])
+        return k1, k2, messages, signatures
+    
+    def test_safe_prime(self):
+        system = ElGamalSignatureSystem(digest_mode=True)
+        k1, k2, messages, signatures = self.check_batch(system)
+        # delta + (p-1)/2 đổi dấu gamma^delta (gamma không chính phương): sai số -1 phải bị bắt
+        gamma, delta = signatures[0].numbers
+        forged = Plaintext([gamma, (delta + (k2.p - 1) // 2) % (k2.p - 1)])
+        self.assertEqual(system.verify_batch(k2, [(messages[0], forged), (messages[1], signatures[1])]), [False, True])
+    
+    def test_bisection_skips_known_bad_half(self):
+        system = ElGamalSignatureSystem(subgroup_bits=160, digest_mode=True)
+        k1, k2 = system.generate_keypair(1024)
+        messages = [system.str2plaintext_signer(k1, f"message {i}") for i in range(8)]
+        signatures = [system.sign(k1, m) for m in messages]
+        signatures[5] = signatures[4]
+        module = sys.modules[__name__]
+        with mock.patch.object(module, "_batch_holds", wraps=module._batch_holds) as holds:
+            results = system.verify_batch(k2, zip(messages, signatures))
+        self.assertEqual(results, [i != 5 for i in range(8)])
+        # [0..3] đúng → [4..7] chắc chắn sai, không thử gộp lại cả nửa phải
+        self.assertEqual([len(c.args[1]) for c in holds.call_args_list], [8, 4, 2, 2])
+
+    def test_verify_agrees_with_batch_outside_subgroup(self):
+        system = ElGamalSignatureSystem(subgroup_bits=160, digest_mode=True)
+        k1, k2 = system.generate_keypair(1024)
+        p, q = k1.p, k1.q
+        message = system.str2plaintext_signer(k1, "message")
+        h = system.new_digest(_plaintext_bytes(message)).exponent(q)
+        # gamma = -g^k (cấp 2q) với delta chẵn: (-g^k)^delta = g^(k·delta) nên phương trình vẫn đúng
+        while True:
+            k = secrets.randbelow(q - 1) + 1
+            gamma = p - gmpy2.powmod(k1.g, k, p)
+            delta = gmpy2.invert(k, q) * (h - k1.a * gamma) % q
+            if delta and delta % 2 == 0:
+                break
+        forged = Plaintext([gamma, delta])
+        self.assertEqual(multi_pow((k2.beta, gamma, k2.g), (gamma % q, delta, -h % q), p), 1)
+        valid = system.sign(k1, message)
+        self.assertFalse(system.verify(k2, message, forged))
+        self.assertEqual(system.verify_batch(k2, [(message, forged), (message, valid)]), [False, True])
+
+    def test_subgroup(self):
+        system = ElGamalSignatureSystem(subgroup_bits=160)
+        k1, k2, messages, signatures = self.check_batch(system, 1024)
+        # gamma ngoài nhóm con cấp q bị loại trước khi gộp
+        numbers = list(signatures[0].numbers)
+        numbers[0] = k2.p - numbers[0]
+        self.assertEqual(system.verify_batch(k2, [(messages[0], Plaintext(numbers)), (messages[1], signatures[1])]), [False, True])
+
 if __name__ == "__main__":
     import unittest
     unittest.main()
\ No newline at end of file
@@ -1,3 +1,6 @@
 from .CryptoElgamal import *
 from .CryptoRSA import *
-from .SignatureElgamal import *
\ No newline at end of file
+from .HybridElgamal import *
+from .ExponentialElgamal import *
+from .SignatureElgamal import *
+from .SerializeElgamal import *
\ No newline at end of file
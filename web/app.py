@@ -1,5 +1,6 @@
 import sys
 import os
+import base64
 import gmpy2
 from flask import Flask, render_template, request, jsonify
 import logging
@@ -18,10 +19,12 @@ try:
     from crypto.system.SignatureElgamal import (
         ElGamalSignatureSystem, ElGamalSignatureSignerKey, ElGamalSignatureVerifierKey
     )
+    from crypto.system.SerializeElgamal import dump_ciphertext, load_ciphertext
     from crypto.pubkey.Plaintext import Plaintext
     
-    from crypto.prime.generate_prime import generate_prime
-    from crypto.prime.is_prime import is_prime
+    from crypto.prime.generate_prime import PrimeGenerator
+    from crypto.prime.parameter_pool import ParameterPool
+    from crypto.prime.is_prime import is_prime_many
     from crypto.prime.prime_root import find_primitive_root
 except ImportError as e:
     print(f"LỖI QUAN TRỌNG: Không thể import thư viện crypto.")
@@ -43,8 +46,27 @@ app.logger.setLevel(logging.INFO)
 # Hoặc tạo instance mới trong mỗi_lần_gọi_api để an toàn hơn.
 # Tạm thời, chúng ta tạo một lần.
 try:
-    crypto_system = ElGamalCryptoSystem()
-    signature_system = ElGamalSignatureSystem()
+    # Pool tiến trình sinh prime dùng chung cho mọi request (tránh spawn lại mỗi lần)
+    prime_generator = PrimeGenerator(workers=os.cpu_count() or 4)
+    # Refill nền dùng generator riêng (khóa job riêng, ít worker, nice cao) để request
+    # sinh khóa / sinh prime không phải xếp hàng sau một lần sinh safe prime 2048-bit
+    refill_generator = PrimeGenerator(
+        workers=max(1, (os.cpu_count() or 2) // 2),
+        nice=int(os.environ.get("ELGAMAL_PARAM_NICE", "10")),
+    )
+    # Kho (p, g) sinh sẵn ở nền, lưu ra đĩa để dùng lại sau khi khởi động lại;
+    # mặc định nhỏ — 2048-bit khi kho trống sẽ được sinh đồng bộ bằng prime_generator
+    parameter_pool = ParameterPool(
+        sizes=[int(b) for b in os.environ.get("ELGAMAL_PARAM_SIZES", "512,1024").split(",")],
+        capacity=int(os.environ.get("ELGAMAL_PARAM_CAPACITY", "4")),
+        low_watermark=int(os.environ.get("ELGAMAL_PARAM_LOW_WATERMARK", "1")),
+        path=os.environ.get("ELGAMAL_PARAM_STORE", os.path.join(script_dir, "params.json")),
+        prime_generator=prime_generator,
+        refill_generator=refill_generator,
+        validate=True,
+    )
+    crypto_system = ElGamalCryptoSystem(prime_generator, parameter_pool)
+    signature_system = ElGamalSignatureSystem(prime_generator, parameter_pool)
 except Exception as e:
     app.logger.error(f"Không thể khởi tạo crypto systems: {e}", exc_info=True)
     sys.exit(1)
@@ -54,21 +76,30 @@ except Exception as e:
 # (Những hàm này giúp chuyển đổi các đối tượng khóa và bản mã
 #  thành JSON và ngược lại, vì chúng chứa các số nguyên lớn)
 
+def _with_subgroup(data: dict, key) -> dict:
+    """Thêm cấp nhóm con q (chế độ Schnorr) nếu khóa có."""
+    if getattr(key, "q", None):
+        data["q"] = str(key.q)
+    return data
+
+def _subgroup_order(data: dict) -> int | None:
+    return int(data['q']) if data.get('q') else None
+
 def serialize_public_key(key: ElGamalCryptoPublicKey) -> dict:
     """Chuyển Public Key thành dict an toàn cho JSON (dùng string)."""
-    return {"p": str(key.p), "g": str(key.g), "beta": str(key.beta)}
+    return _with_subgroup({"p": str(key.p), "g": str(key.g), "beta": str(key.beta)}, key)
 
 def serialize_private_key(key: ElGamalCryptoPrivateKey) -> dict:
     """Chuyển Private Key thành dict an toàn cho JSON (dùng string)."""
-    return {"p": str(key.p), "a": str(key.a)}
+    return _with_subgroup({"p": str(key.p), "a": str(key.a)}, key)
 
 def serialize_verifier_key(key: ElGamalSignatureVerifierKey) -> dict:
     """Chuyển Verifier Key thành dict an toàn cho JSON (dùng string)."""
-    return {"p": str(key.p), "g": str(key.g), "beta": str(key.beta)}
+    return _with_subgroup({"p": str(key.p), "g": str(key.g), "beta": str(key.beta)}, key)
 
 def serialize_signer_key(key: ElGamalSignatureSignerKey) -> dict:
     """Chuyển Signer Key thành dict an toàn cho JSON (dùng string)."""
-    return {"p": str(key.p), "g": str(key.g), "a": str(key.a)}
+    return _with_subgroup({"p": str(key.p), "g": str(key.g), "a": str(key.a)}, key)
 
 def serialize_ciphertext(cipher: ElGamalCiphertext) -> list[dict]:
     """Chuyển Ciphertext (list các cặp) thành list an toàn cho JSON."""
@@ -76,19 +107,19 @@ def serialize_ciphertext(cipher: ElGamalCiphertext) -> list[dict]:
 
 def deserialize_public_key(data: dict) -> ElGamalCryptoPublicKey:
     """Tạo lại Public Key từ dict (chuyển string về int)."""
-    return ElGamalCryptoPublicKey(p=int(data['p']), g=int(data['g']), beta=int(data['beta']))
+    return ElGamalCryptoPublicKey(p=int(data['p']), g=int(data['g']), beta=int(data['beta']), q=_subgroup_order(data))
 
 def deserialize_private_key(data: dict) -> ElGamalCryptoPrivateKey:
     """Tạo lại Private Key từ dict (chuyển string về int)."""
-    return ElGamalCryptoPrivateKey(p=int(data['p']), a=int(data['a']))
+    return ElGamalCryptoPrivateKey(p=int(data['p']), a=int(data['a']), q=_subgroup_order(data))
 
 def deserialize_verifier_key(data: dict) -> ElGamalSignatureVerifierKey:
     """Tạo lại Verifier Key từ dict (chuyển string về int)."""
-    return ElGamalSignatureVerifierKey(p=int(data['p']), g=int(data['g']), beta=int(data['beta']))
+    return ElGamalSignatureVerifierKey(p=int(data['p']), g=int(data['g']), beta=int(data['beta']), q=_subgroup_order(data))
 
 def deserialize_signer_key(data: dict) -> ElGamalSignatureSignerKey:
     """Tạo lại Signer Key từ dict (chuyển string về int)."""
-    return ElGamalSignatureSignerKey(p=int(data['p']), g=int(data['g']), a=int(data['a']))
+    return ElGamalSignatureSignerKey(p=int(data['p']), g=int(data['g']), a=int(data['a']), q=_subgroup_order(data))
 
 def deserialize_ciphertext(data: list[dict]) -> ElGamalCiphertext:
     """Tạo lại Ciphertext từ list dict (chuyển string về int)."""
@@ -114,7 +145,12 @@ def generate_encryption_keys():
         # 1. Tạo khóa mã hóa
         data = request.json
         bits = int(data.get('bits', 512))
-        pub_key, priv_key = crypto_system.generate_keypair(bits)
+        if data.get('subgroupBits'):
+            # chế độ nhóm con Schnorr: khóa/nonce ngắn mod q
+            system = ElGamalCryptoSystem(prime_generator, subgroup_bits=int(data['subgroupBits']))
+            pub_key, priv_key = system.generate_keypair(bits)
+        else:
+            pub_key, priv_key = crypto_system.generate_keypair(bits)
         
         app.logger.info("Tạo khóa thành công.")
         return jsonify({
@@ -133,7 +169,11 @@ def generate_signature_keys():
         # 1. Tạo khóa chữ ký
         data = request.json
         bits = int(data.get('bits', 512))
-        signer_key, verifier_key = signature_system.generate_keypair(bits)
+        if data.get('subgroupBits'):
+            system = ElGamalSignatureSystem(prime_generator, subgroup_bits=int(data['subgroupBits']))
+            signer_key, verifier_key = system.generate_keypair(bits)
+        else:
+            signer_key, verifier_key = signature_system.generate_keypair(bits)
         
         app.logger.info("Tạo khóa chữ ký thành công.")
         return jsonify({
@@ -155,14 +195,19 @@ def encrypt_message():
         
         public_key = deserialize_public_key(key_dict)
         # Chuyển chuỗi đầu vào thành đối tượng Plaintext (list các số)
-        plain_text = Plaintext.from_string(message_str)
+        plain_text = crypto_system.str2plaintext(public_key, message_str)
         
         cipher_text_obj = crypto_system.encrypt(public_key, plain_text)
         
         app.logger.info("Mã hóa thành công.")
+        if data.get('format') == 'binary':
+            # định dạng nhị phân (SerializeElgamal) dạng base64: gọn hơn nhiều so với list số thập phân
+            ciphertext = base64.b64encode(dump_ciphertext(cipher_text_obj, public_key.p)).decode('ascii')
+        else:
+            ciphertext = serialize_ciphertext(cipher_text_obj)
         return jsonify({
             "success": True,
-            "ciphertext": serialize_ciphertext(cipher_text_obj)
+            "ciphertext": ciphertext
         })
     except Exception as e:
         app.logger.error(f"Lỗi khi mã hóa: {e}", exc_info=True)
@@ -177,11 +222,14 @@ def decrypt_message():
         key_dict = data['key']
         
         private_key = deserialize_private_key(key_dict)
-        cipher_text_obj = deserialize_ciphertext(cipher_list)
+        if isinstance(cipher_list, str):
+            cipher_text_obj = load_ciphertext(base64.b64decode(cipher_list))
+        else:
+            cipher_text_obj = deserialize_ciphertext(cipher_list)
         
         decrypted_plaintext = crypto_system.decrypt(private_key, cipher_text_obj)
         # Chuyển đối tượng Plaintext (list các số) về chuỗi gốc
-        decrypted_message = decrypted_plaintext.to_string()
+        decrypted_message = crypto_system.plaintext2str(private_key, decrypted_plaintext)
         
         app.logger.info("Giải mã thành công.")
         return jsonify({
@@ -202,7 +250,7 @@ def sign_message():
         key_dict = data['key']
 
         signer_key = deserialize_signer_key(key_dict)
-        plain_text = Plaintext.from_string(message_str)
+        plain_text = signature_system.str2plaintext_signer(signer_key, message_str)
         
         signature_obj = signature_system.sign(signer_key, plain_text)
         
@@ -228,7 +276,7 @@ def verify_signature():
         verifier_key = deserialize_verifier_key(key_dict)
         
         # Chuyển message string và signature list về Plaintext object
-        message_plaintext = Plaintext.from_string(message_str)
+        message_plaintext = signature_system.str2plaintext_verifier(verifier_key, message_str)
         signature_plaintext = Plaintext([int(num) for num in signature_list])
         
         is_valid = signature_system.verify(verifier_key, message_plaintext, signature_plaintext)
@@ -244,6 +292,11 @@ def verify_signature():
         # Trả về isValid: False nếu có lỗi trong quá trình xác thực
         return jsonify({"success": True, "isValid": False, "error": "Lỗi khi xử lý xác thực."})
 
+@app.route('/api/parameter-pool', methods=['GET'])
+def parameter_pool_stats():
+    """Số cặp (p, g) còn trong kho và các bộ đếm refill theo từng kích thước bit."""
+    return jsonify({"success": True, "stats": {str(bits): s for bits, s in parameter_pool.stats().items()}})
+
 @app.route('/api/tools/generate-prime', methods=['POST'])
 def tools_generate_prime():
     app.logger.info("Yêu cầu /api/tools/generate-prime")
@@ -252,7 +305,7 @@ def tools_generate_prime():
         bits = int(data.get('bits', 1024))
         safe = data.get('safe', False)
 
-        prime_number = generate_prime(bits=bits, safe=safe)
+        prime_number = prime_generator.generate(bits=bits, safe=safe)
         
         app.logger.info(f"Sinh prime thành công: {prime_number}")
         return jsonify({
@@ -268,10 +321,20 @@ def tools_check_prime():
     app.logger.info("Yêu cầu /api/tools/check-prime")
     try:
         data = request.json
+        # 'numbers': kiểm tra cả lô một lần; 'number': một số (giữ tương thích)
+        if 'numbers' in data:
+            numbers = [int(n) for n in data['numbers']]
+            statuses = is_prime_many(numbers, pool=prime_generator)
+            app.logger.info(f"Kiểm tra prime theo lô thành công: {len(numbers)} số")
+            return jsonify({
+                "success": True,
+                "results": statuses
+            })
+
         number_str = data['number']
         number = int(number_str)
         
-        prime_status = is_prime(number)
+        prime_status = is_prime_many([number])[0]
         
         app.logger.info(f"Kiểm tra prime thành công: {number} là prime? {prime_status}")
         return jsonify({